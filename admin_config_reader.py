@@ -4,7 +4,7 @@ Reads configuration from the admin panel and integrates with the Python schedule
 """
 
 import json
-import os
+from bisect import bisect_right
 from typing import Dict, List, Tuple
 from datetime import datetime
 
@@ -20,17 +20,23 @@ class AdminConfigReader:
         """
         self.config_file = config_file
         self.config = self._load_config()
+        self._index_times()
+    
+    def _index_times(self):
+        """Precompute the processing times as a frozenset and a sorted tuple"""
+        self._times_set = frozenset(self.get_processing_times())
+        self._times_sorted = tuple(sorted(self._times_set))
     
     def _load_config(self) -> Dict:
         """Load configuration from JSON file"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r') as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"Error loading admin config: {e}")
-                return self._get_default_config()
-        return self._get_default_config()
+        try:
+            with open(self.config_file, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return self._get_default_config()
+        except Exception as e:
+            print(f"Error loading admin config: {e}")
+            return self._get_default_config()
     
     def _get_default_config(self) -> Dict:
         """Get default configuration"""
@@ -111,12 +117,8 @@ class AdminConfigReader:
         if not self.is_processing_enabled_today():
             return False
         
-        # Get current time
-        current_time = datetime.now().strftime('%H:%M')
-        processing_times = self.get_processing_times()
-        
         # Check if current time matches any processing time
-        return current_time in processing_times
+        return datetime.now().strftime('%H:%M') in self._times_set
     
     def get_next_processing_time(self) -> Tuple[str, str]:
         """
@@ -125,19 +127,20 @@ class AdminConfigReader:
         Returns:
             Tuple of (day_name, time_string) or (None, None) if none configured
         """
-        times = self.get_processing_times()
+        times = self._times_sorted
         if not times:
             return (None, None)
         
-        current_day = datetime.now().strftime('%A').lower()
-        current_time = datetime.now().strftime('%H:%M')
+        now = datetime.now()
+        current_day = now.strftime('%A').lower()
+        current_time = now.strftime('%H:%M')
         schedule = self.get_weekly_schedule()
         
-        # Check remaining times today
+        # Check remaining times today (first sorted time after now)
         if schedule.get(current_day, False):
-            for time in times:
-                if time > current_time:
-                    return (current_day.capitalize(), time)
+            idx = bisect_right(times, current_time)
+            if idx < len(times):
+                return (current_day.capitalize(), times[idx])
         
         # Check next days
         days_order = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
@@ -156,6 +159,7 @@ class AdminConfigReader:
     def reload(self):
         """Reload configuration from file"""
         self.config = self._load_config()
+        self._index_times()
 
 
 # Example usage
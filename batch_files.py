@@ -0,0 +1,30 @@
+"""
+Helpers for locating generated batch files
+Shared by the verification scripts and tests
+"""
+
+import os
+
+
+def walk_files(root, suffix):
+    """Yield (path, mtime, size) for files under root ending with suffix (uses cached DirEntry stats)"""
+    try:
+        entries = os.scandir(root)
+    except FileNotFoundError:
+        return
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_files(entry.path, suffix)
+            elif entry.name.endswith(suffix) and entry.is_file(follow_symlinks=False):
+                st = entry.stat()
+                yield entry.path, st.st_mtime, st.st_size
+
+
+def find_csv_files(batch_dir="batches"):
+    """
+    Find all CSV files in the batches directory, newest first.
+    
+    Returns a list of (path, mtime, size) tuples so callers don't stat the files again.
+    """
+    return sorted(walk_files(batch_dir, ".csv"), key=lambda t: t[1], reverse=True)
@@ -27,7 +27,8 @@ class BolAPIClient:
     OAUTH_TOKEN_URL = "https://login.bol.com/token"
     API_BASE_URL = "https://api.bol.com/retailer"
     
-    def __init__(self, client_id: str, client_secret: str, test_mode: bool = True):
+    def __init__(self, client_id: str, client_secret: str, test_mode: bool = True,
+                 session: Optional[requests.Session] = None):
         """
         Initialize the Bol.com API client
         
@@ -35,6 +36,9 @@ class BolAPIClient:
             client_id: Bol.com client ID
             client_secret: Bol.com client secret
             test_mode: If True, uses test environment (default: True)
+            session: Optional requests.Session to share with other clients, so
+                several accounts reuse the same pooled connections (the caller
+                then owns it and closes it)
         """
         self.client_id = client_id
         self.client_secret = client_secret
@@ -46,7 +50,8 @@ class BolAPIClient:
         self.token_type: str = "Bearer"
         
         # Session for connection pooling
-        self.session = requests.Session()
+        self._owns_session = session is None
+        self.session = requests.Session() if session is None else session
         
     def _get_access_token(self) -> str:
         """
@@ -829,5 +834,6 @@ class BolAPIClient:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Context manager exit"""
-        self.session.close()
+        if self._owns_session:
+            self.session.close()
 
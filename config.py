@@ -35,6 +35,8 @@ SFTP_HOST = "triviu.ssh.transip.me"
 SFTP_PORT = 22
 SFTP_USERNAME = "trivium-ecommercecom"
 SFTP_PASSWORD = "&9z?8zcN&9z?8zcN"
+# Optional private key file (Ed25519/RSA/ECDSA); when set it is tried before the password
+SFTP_PRIVATE_KEY_PATH = None
 SFTP_REMOTE_BATCH_DIR = "/data/sites/web/trivium-ecommercecom/FTP/Batches"
 SFTP_REMOTE_LABEL_DIR = "/data/sites/web/trivium-ecommercecom/FTP/Label"
 
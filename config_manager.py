@@ -5,17 +5,67 @@ Provides Python functions to manage configuration settings without UI.
 Can be used by admin scripts or future UI implementations.
 """
 
+import copy
 import json
 import os
 import logging
+from functools import wraps
 from typing import List, Dict, Optional
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Use orjson for reading the config when it is installed (optional, faster parser)
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
 # Configuration file path
 CONFIG_FILE = "system_config.json"
 
+# Cached derived views of the config, keyed by function name -> (file signature, result)
+_config_cache = {}
+
+
+def _config_signature():
+    """(mtime_ns, size) of the config file, or None if it does not exist yet"""
+    try:
+        st = os.stat(CONFIG_FILE)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _cached_until_config_changes(func):
+    """Reuse a result derived from the config file until the file is modified"""
+    @wraps(func)
+    def wrapper():
+        signature = _config_signature()
+        cached = _config_cache.get(func.__name__)
+        if signature is None or cached is None or cached[0] != signature:
+            cached = (signature, func())
+            _config_cache[func.__name__] = cached
+        # Hand out a copy so callers cannot modify the cached value
+        return copy.deepcopy(cached[1])
+    return wrapper
+
+
+# Last parsed contents of CONFIG_FILE as (file signature, dict), shared by all readers
+_parsed_config = None
+
+
+def _read_config_file() -> Dict:
+    """Parsed contents of CONFIG_FILE; the file is only re-read and re-parsed after it changes"""
+    global _parsed_config
+    signature = _config_signature()
+    if _parsed_config is None or _parsed_config[0] != signature:
+        # Read bytes: orjson parses them directly and json.loads detects UTF-8
+        with open(CONFIG_FILE, 'rb') as f:
+            _parsed_config = (signature, _loads(f.read()))
+    return _parsed_config[1]
+
 
 def load_config() -> Dict:
     """
@@ -69,21 +119,23 @@ def load_config() -> Dict:
         }
     }
     
-    if os.path.exists(CONFIG_FILE):
-        try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # Merge with defaults to ensure all keys exist
-                merged = default_config.copy()
-                merged.update(config)
-                return merged
-        except Exception as e:
-            logger.error(f"Error loading config file: {e}. Using defaults.")
-            return default_config
-    else:
+    # Open directly instead of checking os.path.exists first: a missing file
+    # shows up as FileNotFoundError, saving a stat on every load
+    try:
+        # Copy, since callers such as the update_* functions modify the result
+        config = copy.deepcopy(_read_config_file())
+    except FileNotFoundError:
         # Create default config file
         save_config(default_config)
         return default_config
+    except Exception as e:
+        logger.error(f"Error loading config file: {e}. Using defaults.")
+        return default_config
+    
+    # Merge with defaults to ensure all keys exist
+    merged = default_config.copy()
+    merged.update(config)
+    return merged
 
 
 def save_config(config: Dict) -> bool:
@@ -96,9 +148,13 @@ def save_config(config: Dict) -> bool:
     Returns:
         True if successful, False otherwise
     """
+    global _parsed_config
     try:
         with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=2, ensure_ascii=False)
+        # File mtime can be too coarse to notice back-to-back saves
+        _parsed_config = None
+        _config_cache.clear()
         logger.info(f"Configuration saved to {CONFIG_FILE}")
         return True
     except Exception as e:
@@ -274,6 +330,7 @@ def update_bol_account(name: str, client_id: Optional[str] = None,
     return False
 
 
+@_cached_until_config_changes
 def get_active_bol_accounts() -> List[Dict]:
     """
     Get all active Bol.com accounts.
@@ -324,6 +381,7 @@ def _validate_time_format(time_str: str) -> bool:
         return False
 
 
+@_cached_until_config_changes
 def get_config_summary() -> Dict:
     """
     Get a summary of current configuration (without sensitive data).
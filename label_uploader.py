@@ -4,17 +4,13 @@ Monitors the 'label' subfolder and automatically uploads PDF files to FTP/label
 """
 
 import os
-import time
+import signal
+import threading
 import logging
 import paramiko
 from pathlib import Path
 from typing import Set
-from config import (
-    SFTP_HOST,
-    SFTP_PORT,
-    SFTP_USERNAME,
-    SFTP_PASSWORD,
-)
+from sftp_pool import open_sftp
 
 # Configure logging
 logging.basicConfig(
@@ -27,6 +23,17 @@ logger = logging.getLogger(__name__)
 LOCAL_LABEL_DIR = "label"
 SFTP_REMOTE_LABEL_DIR = "/data/sites/web/trivium-ecommercecom/FTP/Label"
 
+# Separator line for log banners, built once
+SEP = "=" * 80
+
+# Set by SIGTERM/SIGINT so the monitor stops at once instead of after its sleep
+stop_event = threading.Event()
+
+
+def _request_stop(signum, frame):
+    logger.info("🛑 Received signal %d, stopping label monitor", signum)
+    stop_event.set()
+
 
 def ensure_remote_label_directory(sftp: paramiko.SFTPClient) -> bool:
     """
@@ -86,11 +93,7 @@ def upload_label_pdf_to_ftp(local_file_path: str) -> bool:
     transport = None
     try:
         # Connect to SFTP
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30  # Increase banner timeout
-        transport.auth_timeout = 30    # Increase auth timeout
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
+        transport, sftp = open_sftp()
         
         # Ensure remote directory exists
         if not ensure_remote_label_directory(sftp):
@@ -140,9 +143,10 @@ def get_existing_pdf_files(directory: str) -> Set[str]:
     
     pdf_files = set()
     try:
-        for filename in os.listdir(directory):
-            if filename.lower().endswith('.pdf'):
-                pdf_files.add(filename)
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.name.lower().endswith('.pdf') and entry.is_file(follow_symlinks=False):
+                    pdf_files.add(entry.name)
     except Exception as e:
         logger.error(f"❌ Error scanning directory {directory}: {e}")
     
@@ -157,14 +161,14 @@ def monitor_label_folder(check_interval: int = 5, upload_existing: bool = False)
         check_interval: Time in seconds between directory checks (default: 5)
         upload_existing: If True, upload existing PDF files on startup (default: False)
     """
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info("📁 Label PDF Monitor Started")
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info(f"Local directory: {LOCAL_LABEL_DIR}")
     logger.info(f"Remote FTP directory: {SFTP_REMOTE_LABEL_DIR}")
     logger.info(f"Check interval: {check_interval} seconds")
     logger.info(f"Upload existing files: {upload_existing}")
-    logger.info("="*80)
+    logger.info(SEP)
     
     # Create local directory if it doesn't exist
     os.makedirs(LOCAL_LABEL_DIR, exist_ok=True)
@@ -183,32 +187,42 @@ def monitor_label_folder(check_interval: int = 5, upload_existing: bool = False)
     # Start monitoring loop
     logger.info("\n🔍 Monitoring for new PDF files... (Press Ctrl+C to stop)\n")
     
+    stop_event.clear()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _request_stop)
+        signal.signal(signal.SIGINT, _request_stop)
+    
     try:
-        while True:
+        while not stop_event.is_set():
             current_files = get_existing_pdf_files(LOCAL_LABEL_DIR)
             new_files = current_files - known_files
             
             if new_files:
-                logger.info(f"🆕 Detected {len(new_files)} new PDF file(s)")
+                logger.info("🆕 Detected %d new PDF file(s)", len(new_files))
+                # Small delay to ensure files are fully written (once per batch)
+                if stop_event.wait(0.5):
+                    break
                 for filename in new_files:
                     local_path = os.path.join(LOCAL_LABEL_DIR, filename)
-                    # Small delay to ensure file is fully written
-                    time.sleep(0.5)
                     if upload_label_pdf_to_ftp(local_path):
                         known_files.add(filename)
             
             # Check for deleted files
             deleted_files = known_files - current_files
             if deleted_files:
-                logger.info(f"🗑️  Removed {len(deleted_files)} file(s) from tracking")
+                logger.info("🗑️  Removed %d file(s) from tracking", len(deleted_files))
                 known_files = current_files
             
-            time.sleep(check_interval)
+            stop_event.wait(check_interval)
+        
+        logger.info("\n\n%s", SEP)
+        logger.info("🛑 Monitor stopped")
+        logger.info(SEP)
             
     except KeyboardInterrupt:
-        logger.info("\n\n" + "="*80)
+        logger.info("\n\n%s", SEP)
         logger.info("🛑 Monitor stopped by user")
-        logger.info("="*80)
+        logger.info(SEP)
 
 
 def upload_all_labels():
@@ -216,9 +230,9 @@ def upload_all_labels():
     Upload all existing PDF files in the label folder to FTP.
     Useful for batch uploads or manual sync.
     """
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info("📤 Uploading All Label PDFs")
-    logger.info("="*80)
+    logger.info(SEP)
     
     pdf_files = get_existing_pdf_files(LOCAL_LABEL_DIR)
     
@@ -238,9 +252,9 @@ def upload_all_labels():
         else:
             fail_count += 1
     
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info(f"✅ Upload complete: {success_count} successful, {fail_count} failed")
-    logger.info("="*80)
+    logger.info(SEP)
 
 
 if __name__ == "__main__":
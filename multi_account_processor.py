@@ -5,6 +5,11 @@ Processes orders from multiple Bol.com accounts (Trivium, Jean, etc.)
 """
 
 import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import List, Dict, Optional
 
 from bol_api_client import BolAPIClient
@@ -28,6 +33,50 @@ from config_manager import get_active_bol_accounts, get_config_summary
 
 logger = logging.getLogger(__name__)
 
+# Batch numbers come from the files already in today's batch directory, so
+# accounts processed in parallel must not generate their files at the same time
+_BATCH_LOCK = threading.Lock()
+
+# Accounts whose name is also a shop name; other accounts use the default shop
+_KNOWN_SHOPS = frozenset(('Trivium', 'Jean'))
+
+# Separator line for log banners, built once
+SEP = "=" * 80
+
+# One HTTP session shared by every account's API client, so the accounts reuse
+# the same keep-alive connections to login.bol.com / api.bol.com
+_HTTP_SESSION: Optional[requests.Session] = None
+_HTTP_SESSION_LOCK = threading.Lock()
+
+
+def _shared_session() -> requests.Session:
+    """Return the shared HTTP session, creating it on first use"""
+    global _HTTP_SESSION
+    with _HTTP_SESSION_LOCK:
+        if _HTTP_SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+            session.mount('https://', adapter)
+            _HTTP_SESSION = session
+        return _HTTP_SESSION
+
+
+def _account_result(account_name: str, shop_name: str, total_orders: int = 0,
+                    processed: int = 0, files_created: Optional[List[str]] = None,
+                    error: Optional[str] = None) -> Dict:
+    """Build the result dict returned by process_account"""
+    result = {
+        'account': account_name,
+        'shop': shop_name,
+        'total_orders': total_orders,
+        'processed': processed,
+        'files_created': files_created if files_created is not None else [],
+        'success': error is None
+    }
+    if error is not None:
+        result['error'] = error
+    return result
+
 
 def process_account(account_name: str, client_id: str, client_secret: str, 
                     shop_name: str, test_mode: bool = True) -> Dict:
@@ -51,7 +100,8 @@ def process_account(account_name: str, client_id: str, client_secret: str,
         init_database()
         
         # Create API client for this account
-        client = BolAPIClient(client_id, client_secret, test_mode=test_mode)
+        client = BolAPIClient(client_id, client_secret, test_mode=test_mode,
+                              session=_shared_session())
         
         # Fetch orders
         raw_orders = client.get_all_open_orders()
@@ -59,75 +109,95 @@ def process_account(account_name: str, client_id: str, client_secret: str,
         
         if not all_orders:
             logger.info(f"No open orders for account {account_name}")
-            return {
-                'account': account_name,
-                'shop': shop_name,
-                'total_orders': 0,
-                'processed': 0,
-                'files_created': [],
-                'success': True
-            }
+            return _account_result(account_name, shop_name)
         
         # Filter out already processed orders
         order_ids = [order.order_id for order in all_orders]
-        unprocessed_order_ids = get_unprocessed_orders(order_ids)
+        unprocessed_order_ids = set(get_unprocessed_orders(order_ids))
         orders = [order for order in all_orders if order.order_id in unprocessed_order_ids]
         
         if not orders:
             logger.info(f"No new unprocessed orders for account {account_name}")
-            return {
-                'account': account_name,
-                'shop': shop_name,
-                'total_orders': len(all_orders),
-                'processed': 0,
-                'files_created': [],
-                'success': True
-            }
+            return _account_result(account_name, shop_name, total_orders=len(all_orders))
         
         logger.info(f"Processing {len(orders)} new orders for {account_name} (from {len(all_orders)} total)")
         
         # Classify orders
         grouped = classify_orders(orders)
         
-        # Generate Excel files (with shop name override)
-        # Note: We need to modify generate_excel_batches to accept shop_name
-        # For now, we'll use the default shop name from config
-        files_created, total_orders = generate_excel_batches(grouped, client)
-        
-        # Upload CSV files
-        if files_created:
-            upload_files_sftp(files_created)
+        with _BATCH_LOCK:
+            # Generate Excel files (with shop name override)
+            # Note: We need to modify generate_excel_batches to accept shop_name
+            # For now, we'll use the default shop name from config
+            files_created, total_orders = generate_excel_batches(grouped, client)
             
-            # Upload label PDFs
-            if LABEL_UPLOADER_AVAILABLE:
-                try:
-                    upload_all_labels()
-                except Exception as e:
-                    logger.error(f"Failed to upload label PDFs for {account_name}: {e}")
+            # Upload CSV files
+            if files_created:
+                upload_files_sftp(files_created)
+                
+                # Upload label PDFs
+                if LABEL_UPLOADER_AVAILABLE:
+                    try:
+                        upload_all_labels()
+                    except Exception as e:
+                        logger.error(f"Failed to upload label PDFs for {account_name}: {e}")
         
         # Send email summary
         send_summary_email(total_orders, files_created)
         
-        return {
-            'account': account_name,
-            'shop': shop_name,
-            'total_orders': len(all_orders),
-            'processed': total_orders,
-            'files_created': files_created,
-            'success': True
-        }
+        return _account_result(account_name, shop_name, total_orders=len(all_orders),
+                               processed=total_orders, files_created=files_created)
         
     except Exception as e:
         logger.error(f"Error processing account {account_name}: {e}")
-        return {
-            'account': account_name,
-            'shop': shop_name,
-            'total_orders': 0,
-            'processed': 0,
-            'files_created': [],
-            'success': False,
-            'error': str(e)
-        }
+        return _account_result(account_name, shop_name, error=str(e))
+
+
+def run_all_accounts(accounts: List[Dict], default_shop: str, test_mode: bool = True) -> List[Dict]:
+    """
+    Run process_account for each account and return their results.
+    
+    Args:
+        accounts: Account dicts with 'name', 'client_id' and 'client_secret'
+        default_shop: Shop name for accounts whose name is not a known shop
+        test_mode: Whether to use test mode
+        
+    Returns:
+        List of process_account result dicts, in the same order as accounts
+    """
+    if not accounts:
+        return []
+    
+    # Use account name as shop name, or default
+    shop_for = {
+        a['name']: (a['name'] if a['name'] in _KNOWN_SHOPS else default_shop)
+        for a in accounts
+    }
+    
+    # Accounts are independent, so fetch their orders concurrently; file
+    # generation and upload are still serialized by _BATCH_LOCK
+    init_database()
+    with ThreadPoolExecutor(max_workers=len(accounts)) as executor:
+        futures = {}
+        for index, account in enumerate(accounts):
+            account_name = account['name']
+            futures[executor.submit(
+                process_account,
+                account_name=account_name,
+                client_id=account['client_id'],
+                client_secret=account['client_secret'],
+                shop_name=shop_for[account_name],
+                test_mode=test_mode
+            )] = index
+        
+        results = {}
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            logger.info(f"✅ Account {accounts[index]['name']} finished")
+        
+        # Return in account order so results line up with the configuration
+        return [results[index] for index in sorted(results)]
 
 
 def process_all_accounts() -> Dict:
@@ -137,9 +207,9 @@ def process_all_accounts() -> Dict:
     Returns:
         Dictionary with processing results for each account
     """
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info("MULTI-ACCOUNT ORDER PROCESSING")
-    logger.info("="*80)
+    logger.info(SEP)
     
     # Get active accounts
     active_accounts = get_active_bol_accounts()
@@ -154,33 +224,15 @@ def process_all_accounts() -> Dict:
             'results': []
         }
     
-    results = []
-    total_orders_all = 0
+    results = run_all_accounts(active_accounts, default_shop, test_mode=True)  # TODO: test_mode from config
     
-    for account in active_accounts:
-        account_name = account['name']
-        client_id = account['client_id']
-        client_secret = account['client_secret']
-        
-        # Use account name as shop name, or default
-        shop_name = account_name if account_name in ['Trivium', 'Jean'] else default_shop
-        
-        result = process_account(
-            account_name=account_name,
-            client_id=client_id,
-            client_secret=client_secret,
-            shop_name=shop_name,
-            test_mode=True  # TODO: Get from config
-        )
-        
-        results.append(result)
-        total_orders_all += result.get('processed', 0)
+    total_orders_all = sum(result.get('processed', 0) for result in results)
     
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info(f"Multi-account processing complete:")
     logger.info(f"  Accounts processed: {len(results)}")
     logger.info(f"  Total orders processed: {total_orders_all}")
-    logger.info("="*80)
+    logger.info(SEP)
     
     return {
         'accounts_processed': len(results),
@@ -12,13 +12,18 @@ Responsibilities:
 """
 
 import os
+import re
 import sys
 import logging
+import signal
+import threading
 import traceback
 import time as time_module
-from datetime import datetime, date
-from typing import List, Dict, Tuple, Optional, Any
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Tuple, Optional, Any, Callable
 import base64
+from bisect import bisect_right
 
 from bol_api_client import BolAPIClient
 from bol_dtos import Order
@@ -63,6 +68,7 @@ except ImportError:
 
 import paramiko
 import smtplib
+from sftp_pool import SFTPPool, sftp_session
 from smtplib import SMTP_SSL
 from email.message import EmailMessage
 
@@ -72,6 +78,12 @@ logger = logging.getLogger(__name__)
 # Label directory for storing PDF shipping labels
 LABEL_DIR = "label"
 
+# Number of background workers uploading CSV files while later batches are generated
+UPLOAD_WORKERS = 3
+
+# Plain-text ZPL: starts with ^XA, or mentions "ZPL" in any case (one scan, no upper() copy)
+_ZPL_RE = re.compile(r"^\^XA|(?i:zpl)")
+
 
 def _ensure_directory(path: str) -> None:
     """Create directory if it does not exist."""
@@ -105,18 +117,20 @@ def _determine_next_batch_number(batch_dir: str) -> str:
     Files are named like:
       S-001.csv, SL-001.csv, M-001.csv, S-002.csv, SL-002.csv, M-002.csv, ...
     """
-    existing = [f for f in os.listdir(batch_dir) if f.endswith(".csv")]
-    numbers = []
-    for name in existing:
-        try:
-            base = os.path.splitext(name)[0]
-            # Extract number from filename: S-001 → 001, SL-002 → 002
-            _, num_str = base.split("-", 1)
-            numbers.append(int(num_str))
-        except (ValueError, IndexError):
-            continue
+    # Keep a running max while scanning instead of building name/number lists
+    highest = 0
+    with os.scandir(batch_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".csv") or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                # Extract number from filename: S-001 → 001, SL-002 → 002
+                _, num_str = entry.name[:-4].split("-", 1)
+                highest = max(highest, int(num_str))
+            except ValueError:
+                continue
     # Next batch number is max + 1, or 001 if no files exist
-    next_num = max(numbers) + 1 if numbers else 1
+    next_num = highest + 1
     return f"{next_num:03d}"  # Format as 001, 002, 003, etc.
 
 
@@ -427,7 +441,7 @@ def _fetch_zpl_label(client: BolAPIClient, order_item_id: str, order_id: str, qu
                 return zpl_data
             except Exception:
                 zpl_data = str(label_data)
-                if zpl_data.startswith('^XA') or 'ZPL' in zpl_data.upper() or len(zpl_data) > 100:
+                if len(zpl_data) > 100 or _ZPL_RE.search(zpl_data):
                     logger.info(f"✅ Found ZPL label (plain text) in response ({len(zpl_data)} chars)")
                     return zpl_data
                 return zpl_data if zpl_data else ""
@@ -715,6 +729,7 @@ def _create_csv_for_category(
 def generate_csv_batches(
     grouped_orders: Dict[str, List[Order]],
     client: Optional[BolAPIClient] = None,
+    on_file_created: Optional[Callable[[str], None]] = None,
 ) -> Tuple[List[str], int]:
     """
     Generate CSV files for each category that has orders.
@@ -725,6 +740,12 @@ def generate_csv_batches(
     
     The batch number in the CSV file's "Batch Number" column MUST match the filename.
 
+    Args:
+        grouped_orders: Orders grouped by category (see classify_orders)
+        client: Optional API client used to fetch shipping labels
+        on_file_created: Optional callback invoked with each file path as soon as
+            it is written (e.g. to start its SFTP upload while the next file is built)
+
     Returns:
         (list of file paths created, total_orders_in_all_files)
     """
@@ -755,6 +776,9 @@ def generate_csv_batches(
         total_orders += len(orders)
         logger.info("Generated %s with %d orders (batch number in column: %s)", filename, len(orders), f"{prefix}-{batch_number}")
 
+        if on_file_created:
+            on_file_created(full_path)
+
     return files_created, total_orders
 
 
@@ -762,84 +786,105 @@ def generate_csv_batches(
 generate_excel_batches = generate_csv_batches
 
 
-def upload_files_sftp(file_paths: List[str]) -> None:
+def _upload_one(file_path: str, pool: Optional[SFTPPool] = None) -> None:
+    """Upload a single generated file (used as a background upload task)."""
+    upload_files_sftp([file_path], pool=pool)
+
+
+def _put_files(sftp: paramiko.SFTPClient, file_paths: List[str]) -> Tuple[int, int]:
+    """Upload files over an open SFTP client; returns (uploaded_count, failed_count)."""
+    uploaded_count = 0
+    failed_count = 0
+
+    # Ensure remote directory exists (best-effort)
+    try:
+        sftp.chdir(SFTP_REMOTE_BATCH_DIR)
+        logger.info("Remote directory exists: %s", SFTP_REMOTE_BATCH_DIR)
+    except IOError:
+        # Try to create directories recursively
+        logger.info("Creating remote directory: %s", SFTP_REMOTE_BATCH_DIR)
+        parts = SFTP_REMOTE_BATCH_DIR.strip("/").split("/")
+        current = ""
+        for part in parts:
+            current = f"{current}/{part}" if current else f"/{part}"
+            try:
+                sftp.chdir(current)
+            except IOError:
+                try:
+                    sftp.mkdir(current)
+                    logger.info("Created directory: %s", current)
+                except IOError:
+                    # Upload workers run in parallel; another one may have just
+                    # created it. The chdir below still fails if it really is missing
+                    pass
+                sftp.chdir(current)
+
+    # Upload each file
+    for local_path in file_paths:
+        if not os.path.exists(local_path):
+            logger.error("Local file does not exist: %s", local_path)
+            failed_count += 1
+            continue
+            
+        filename = os.path.basename(local_path)
+        remote_path = os.path.join(SFTP_REMOTE_BATCH_DIR, filename).replace("\\", "/")
+        
+        try:
+            logger.info("Uploading %s to %s", filename, remote_path)
+            sftp.put(local_path, remote_path)
+            
+            # Verify upload by checking file exists and size matches
+            try:
+                remote_stat = sftp.stat(remote_path)
+                local_size = os.path.getsize(local_path)
+                if remote_stat.st_size == local_size:
+                    logger.info("✅ Successfully uploaded %s (%d bytes)", filename, local_size)
+                    uploaded_count += 1
+                else:
+                    logger.warning(
+                        "⚠️ Upload size mismatch for %s: local=%d, remote=%d",
+                        filename, local_size, remote_stat.st_size
+                    )
+                    uploaded_count += 1  # Still count as uploaded
+            except Exception as verify_error:
+                logger.warning("Could not verify upload for %s: %s", filename, verify_error)
+                uploaded_count += 1  # Assume uploaded if we can't verify
+                
+        except Exception as upload_error:
+            logger.error("❌ Failed to upload %s: %s", filename, upload_error)
+            failed_count += 1
+
+    return uploaded_count, failed_count
+
+
+def upload_files_sftp(file_paths: List[str], pool: Optional[SFTPPool] = None) -> None:
     """
     Upload generated files to the configured SFTP server.
     Verifies each upload was successful.
+
+    If a pool is given, a connection is borrowed from it instead of opening
+    (and closing) a new one for this call.
     """
     if not file_paths:
         logger.info("No files to upload to SFTP.")
         return
 
-    transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-    transport.banner_timeout = 30  # Increase banner timeout
-    transport.auth_timeout = 30    # Increase auth timeout
     uploaded_count = 0
     failed_count = 0
     
     try:
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        logger.info("Connected to SFTP server: %s:%d", SFTP_HOST, SFTP_PORT)
-
-        # Ensure remote directory exists (best-effort)
-        try:
-            sftp.chdir(SFTP_REMOTE_BATCH_DIR)
-            logger.info("Remote directory exists: %s", SFTP_REMOTE_BATCH_DIR)
-        except IOError:
-            # Try to create directories recursively
-            logger.info("Creating remote directory: %s", SFTP_REMOTE_BATCH_DIR)
-            parts = SFTP_REMOTE_BATCH_DIR.strip("/").split("/")
-            current = ""
-            for part in parts:
-                current = f"{current}/{part}" if current else f"/{part}"
-                try:
-                    sftp.chdir(current)
-                except IOError:
-                    sftp.mkdir(current)
-                    sftp.chdir(current)
-                    logger.info("Created directory: %s", current)
-
-        # Upload each file
-        for local_path in file_paths:
-            if not os.path.exists(local_path):
-                logger.error("Local file does not exist: %s", local_path)
-                failed_count += 1
-                continue
-                
-            filename = os.path.basename(local_path)
-            remote_path = os.path.join(SFTP_REMOTE_BATCH_DIR, filename).replace("\\", "/")
-            
-            try:
-                logger.info("Uploading %s to %s", filename, remote_path)
-                sftp.put(local_path, remote_path)
-                
-                # Verify upload by checking file exists and size matches
-                try:
-                    remote_stat = sftp.stat(remote_path)
-                    local_size = os.path.getsize(local_path)
-                    if remote_stat.st_size == local_size:
-                        logger.info("✅ Successfully uploaded %s (%d bytes)", filename, local_size)
-                        uploaded_count += 1
-                    else:
-                        logger.warning(
-                            "⚠️ Upload size mismatch for %s: local=%d, remote=%d",
-                            filename, local_size, remote_stat.st_size
-                        )
-                        uploaded_count += 1  # Still count as uploaded
-                except Exception as verify_error:
-                    logger.warning("Could not verify upload for %s: %s", filename, verify_error)
-                    uploaded_count += 1  # Assume uploaded if we can't verify
-                    
-            except Exception as upload_error:
-                logger.error("❌ Failed to upload %s: %s", filename, upload_error)
-                failed_count += 1
+        if pool is not None:
+            with pool.acquire() as sftp:
+                uploaded_count, failed_count = _put_files(sftp, file_paths)
+        else:
+            with sftp_session() as sftp:
+                logger.info("Connected to SFTP server: %s:%d", SFTP_HOST, SFTP_PORT)
+                uploaded_count, failed_count = _put_files(sftp, file_paths)
                 
     except Exception as e:
         logger.error("❌ SFTP connection/upload error: %s", e)
         failed_count = len(file_paths)
     finally:
-        transport.close()
         logger.info(
             "SFTP upload complete: %d successful, %d failed out of %d total",
             uploaded_count, failed_count, len(file_paths)
@@ -906,18 +951,24 @@ def send_summary_email(total_orders: int, file_paths: List[str]) -> None:
         logger.error(f"❌ Failed to send email: {e}")
         logger.error(f"   This is non-critical - processing completed successfully but email notification failed")
         # Don't raise the exception - email failure shouldn't stop the process
-        import traceback
-        logger.debug(f"Email error traceback: {traceback.format_exc()}")
+        logger.debug("Email error traceback: %s", traceback.format_exc())
 
 
-def run_processing_once() -> None:
-    """Run one full processing cycle: fetch, classify, Excel, upload, email."""
+def run_processing_once(client: Optional[BolAPIClient] = None) -> None:
+    """
+    Run one full processing cycle: fetch, classify, Excel, upload, email.
+    
+    Args:
+        client: Optional BolAPIClient to reuse (and its access token) across runs;
+            a new one is created when not given
+    """
     logger.info("Starting Bol.com order processing run...")
     
     # Initialize database
     init_database()
 
-    client = BolAPIClient(BOL_CLIENT_ID, BOL_CLIENT_SECRET, test_mode=TEST_MODE)
+    if client is None:
+        client = BolAPIClient(BOL_CLIENT_ID, BOL_CLIENT_SECRET, test_mode=TEST_MODE)
     raw_orders = client.get_all_open_orders()
     all_orders = [Order.from_dict(o) for o in raw_orders]
 
@@ -927,7 +978,7 @@ def run_processing_once() -> None:
     
     # Filter out already processed orders
     order_ids = [order.order_id for order in all_orders]
-    unprocessed_order_ids = get_unprocessed_orders(order_ids)
+    unprocessed_order_ids = set(get_unprocessed_orders(order_ids))
     
     # Keep only unprocessed orders
     orders = [order for order in all_orders if order.order_id in unprocessed_order_ids]
@@ -939,12 +990,26 @@ def run_processing_once() -> None:
     logger.info(f"Processing {len(orders)} new orders (filtered from {len(all_orders)} total)")
 
     grouped = classify_orders(orders)
-    files_created, total_orders = generate_excel_batches(grouped, client)
+
+    # Upload each CSV in the background as soon as it is written, so the SFTP
+    # transfer of one batch overlaps with building the next one. Workers borrow
+    # connections from a shared SFTP pool instead of connecting per file
+    upload_futures: List[Future] = []
+    sftp_pool = SFTPPool(SFTP_HOST, SFTP_PORT, SFTP_USERNAME, SFTP_PASSWORD, size=UPLOAD_WORKERS)
+    try:
+        with ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as upload_pool:
+            files_created, total_orders = generate_excel_batches(
+                grouped,
+                client,
+                on_file_created=lambda path: upload_futures.append(
+                    upload_pool.submit(_upload_one, path, sftp_pool)
+                ),
+            )
+            wait(upload_futures)
+    finally:
+        sftp_pool.close()
 
     if files_created:
-        # Upload CSV files to SFTP
-        upload_files_sftp(files_created)
-        
         # Upload label PDFs to SFTP
         if LABEL_UPLOADER_AVAILABLE:
             try:
@@ -963,16 +1028,47 @@ def run_processing_once() -> None:
     logger.info("Processing run completed. Orders processed: %d", total_orders)
 
 
-def _normalize_time_string(t: str) -> str:
-    """Return HH:MM (24h) or empty string if invalid/blank."""
-    t = (t or "").strip()
-    if not t:
-        return ""
-    try:
-        dt = datetime.strptime(t, "%H:%M")
-        return dt.strftime("%H:%M")
-    except ValueError:
-        return ""
+# H:MM / HH:MM (surrounding whitespace allowed); ranges are checked separately
+_HHMM_RE = re.compile(r"\s*(\d{1,2}):(\d{1,2})\s*")
+
+
+def _parse_process_times(raw_times: List[str]) -> Tuple[Tuple[int, int], ...]:
+    """Parse HH:MM (24h) strings into a sorted tuple of unique (hour, minute); blank/invalid entries are skipped."""
+    slots = set()
+    for t in raw_times:
+        m = _HHMM_RE.fullmatch(t or "")
+        if not m:
+            continue
+        hour, minute = int(m.group(1)), int(m.group(2))
+        if hour < 24 and minute < 60:
+            slots.add((hour, minute))
+    return tuple(sorted(slots))
+
+
+# Set by SIGINT/SIGTERM to stop run_scheduler() without waiting out its sleep
+shutdown_event = threading.Event()
+
+# Longest the scheduler sleeps before re-reading the clock, so system clock
+# adjustments (DST, NTP corrections) are noticed
+SCHEDULER_MAX_SLEEP = 300
+
+
+def _slot_datetimes(slots: Tuple[Tuple[int, int], ...], day: date) -> Tuple[datetime, ...]:
+    """The (hour, minute) slots as sorted datetimes on the given day."""
+    return tuple(datetime(day.year, day.month, day.day, hour, minute) for hour, minute in slots)
+
+
+def _next_slot(day_slots: Tuple[datetime, ...], now: datetime) -> datetime:
+    """Start of the next slot after now, given today's slot datetimes (wraps to tomorrow)."""
+    i = bisect_right(day_slots, now)
+    if i < len(day_slots):
+        return day_slots[i]
+    return day_slots[0] + timedelta(days=1)
+
+
+def _request_shutdown(signum, frame) -> None:
+    logger.info("Received signal %s, stopping scheduler...", signum)
+    shutdown_event.set()
 
 
 def run_scheduler() -> None:
@@ -984,30 +1080,49 @@ def run_scheduler() -> None:
     NOTE: In production you can instead call run_processing_once()
     directly via cron at the desired times.
     """
-    times = [_normalize_time_string(t) for t in PROCESS_TIMES]
-    times = [t for t in times if t]
-    if not times:
+    slots = _parse_process_times(PROCESS_TIMES)
+    if not slots:
         logger.warning("No valid PROCESS_TIMES configured; scheduler will not run.")
         return
 
-    logger.info("Starting scheduler with times: %s", ", ".join(times))
+    logger.info("Starting scheduler with times: %s", ", ".join(f"{h:02d}:{m:02d}" for h, m in slots))
 
-    last_run: Dict[str, date] = {}  # time_str -> date when last run
+    slot_set = frozenset(slots)  # membership test per check; the sorted tuple is for bisect
+    last_run: Dict[Tuple[int, int], date] = {}  # (hour, minute) -> date when last run
+    announced_slot: Optional[datetime] = None  # next run last written to the log
+    slots_day: Optional[date] = None  # day that day_slots was built for
+    day_slots: Tuple[datetime, ...] = ()
+
+    # Signal handlers can only be installed from the main thread
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, _request_shutdown)
+        signal.signal(signal.SIGTERM, _request_shutdown)
 
     try:
-        while True:
+        while not shutdown_event.is_set():
             now = datetime.now()
-            current_hm = now.strftime("%H:%M")
+            current_hm = (now.hour, now.minute)
             today = now.date()
 
-            if current_hm in times:
+            if current_hm in slot_set:
                 if last_run.get(current_hm) != today:
-                    logger.info("Triggering scheduled run for %s", current_hm)
+                    logger.info("Triggering scheduled run for %02d:%02d", *current_hm)
                     run_processing_once()
                     last_run[current_hm] = today
 
-            # Sleep 30 seconds between checks
-            time_module.sleep(30)
+            # Sleep until the next scheduled slot; a shutdown signal ends the wait immediately
+            now = datetime.now()
+            if now.date() != slots_day:
+                # Rebuilt once a day; in between, finding the next run is one bisect
+                slots_day = now.date()
+                day_slots = _slot_datetimes(slots, slots_day)
+            next_slot = _next_slot(day_slots, now)
+            if next_slot != announced_slot:
+                # Only log when it changes, not after every capped wake-up
+                logger.info("⏰ Next scheduled processing: %s", next_slot.strftime("%Y-%m-%d %H:%M"))
+                announced_slot = next_slot
+            shutdown_event.wait(min((next_slot - now).total_seconds(), SCHEDULER_MAX_SLEEP))
+        logger.info("Scheduler stopped.")
     except KeyboardInterrupt:
         logger.info("Scheduler stopped by user.")
 
@@ -4,6 +4,9 @@ This script calls each API separately to ensure correct shop attribution
 """
 
 import logging
+import os
+import traceback
+import order_processing
 from bol_api_client import BolAPIClient
 from bol_dtos import Order
 from order_processing import (
@@ -73,7 +76,7 @@ def process_shop(shop_name: str, client_id: str, client_secret: str, test_mode:
         else:
             # Filter unprocessed orders only
             order_ids = [order.order_id for order in all_orders]
-            unprocessed_order_ids = get_unprocessed_orders(order_ids)
+            unprocessed_order_ids = set(get_unprocessed_orders(order_ids))
             orders = [order for order in all_orders if order.order_id in unprocessed_order_ids]
             
             if not orders:
@@ -89,7 +92,6 @@ def process_shop(shop_name: str, client_id: str, client_secret: str, test_mode:
             logger.info(f"Processing {len(orders)} new orders for {shop_name}")
         
         # Temporarily override DEFAULT_SHOP_NAME
-        import order_processing
         original_shop_name = order_processing.DEFAULT_SHOP_NAME
         order_processing.DEFAULT_SHOP_NAME = shop_name
         
@@ -106,7 +108,6 @@ def process_shop(shop_name: str, client_id: str, client_secret: str, test_mode:
             # Log generated files
             logger.info(f"Generated {len(files_created)} CSV files for {shop_name}:")
             for f in files_created:
-                import os
                 logger.info(f"  - {os.path.basename(f)}")
             
             # Upload CSV files
@@ -138,7 +139,6 @@ def process_shop(shop_name: str, client_id: str, client_secret: str, test_mode:
         
     except Exception as e:
         logger.error(f"❌ Error processing {shop_name}: {e}")
-        import traceback
         traceback.print_exc()
         return {
             'shop': shop_name,
@@ -3,118 +3,138 @@ Quick test to verify CSV files and system status
 """
 
 import os
-import glob
+import io
+import sys
 import csv
+import string
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from order_database import get_processed_count, get_processed_orders_summary
+from batch_files import find_csv_files
 
-def find_csv_files():
-    """Find all CSV files in batches directory"""
-    pattern = "batches/**/*.csv"
-    files = glob.glob(pattern, recursive=True)
-    return sorted(files, key=os.path.getmtime, reverse=True)
+# Spreadsheet-style column letters by 1-based index: A..Z, then AA..ZZ
+_COL = [''] + list(string.ascii_uppercase) + [a + b for a in string.ascii_uppercase for b in string.ascii_uppercase]
 
-def test_csv_file(file_path):
-    """Test a single CSV file"""
-    print(f"\n{'='*80}")
-    print(f"Testing: {os.path.basename(file_path)}")
-    print(f"Path: {file_path}")
-    print('='*80)
+# Columns every batch file must have (per requirements), in report order
+_REQUIRED = ("Order ID", "Shop", "MP EAN", "Quantity", "Shipping Label",
+             "Order Time", "Batch Type", "Batch Number", "Order Status")
+
+def test_csv_file(file_path, out=None):
+    """Test a single CSV file (report is written to out, default stdout)"""
+    out = out or sys.stdout
+    print(f"\n{'='*80}", file=out)
+    print(f"Testing: {os.path.basename(file_path)}", file=out)
+    print(f"Path: {file_path}", file=out)
+    print('='*80, file=out)
     
     try:
         with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
             reader = csv.reader(csvfile)
-            rows = list(reader)
-        
-        if not rows:
-            print("❌ File is empty")
-            return False
+            headers = next(reader, None)
+            
+            if headers is None:
+                print("❌ File is empty", file=out)
+                return False
+            
+            header_set = set(headers)
+            shop_idx = headers.index("Shop") if "Shop" in header_set else None
+            zpl_idx = headers.index("Shipping Label") if "Shipping Label" in header_set else None
+            
+            # Single pass over the file: collect the shop preview (first 5 rows) and
+            # the label preview (first 9 rows) while counting, then count the rest
+            shop_values = set()
+            shop_lines = []
+            zpl_lines = []
+            zpl_count = 0
+            empty_count = 0
+            total_rows = 0
+            for row_idx, row in enumerate(islice(reader, 9), start=2):
+                if not any(row):
+                    continue
+                total_rows += 1
+                
+                if shop_idx is not None and row_idx <= 6:  # First 5 rows
+                    shop_val = row[shop_idx] if shop_idx < len(row) else None
+                    if shop_val:
+                        shop_values.add(shop_val)
+                        shop_lines.append(f"   Row {row_idx}: {shop_val}")
+                
+                if zpl_idx is not None and row_idx <= 10:  # Check first 10 rows
+                    zpl_val = row[zpl_idx] if zpl_idx < len(row) else None
+                    if zpl_val:
+                        zpl_count += 1
+                        # csv cells are already str: measure and slice the preview in place
+                        zpl_len = len(zpl_val)
+                        if zpl_len > 50:
+                            zpl_lines.append(f"   Row {row_idx}: ZPL present ({zpl_len} chars) - {zpl_val[:50]}...")
+                        else:
+                            zpl_lines.append(f"   Row {row_idx}: ZPL present ({zpl_len} chars)")
+                    else:
+                        empty_count += 1
+            
+            # Past the preview window only non-empty rows are counted; map/any/sum
+            # keep this loop in C instead of running Python bytecode per row
+            total_rows += sum(map(any, reader))
         
-        # Get headers
-        headers = rows[0]
-        print(f"\n📋 Headers ({len(headers)} columns):")
+        print(f"\n📋 Headers ({len(headers)} columns):", file=out)
         for i, header in enumerate(headers, 1):
-            print(f"   {chr(64+i)}: {header}")
-        
-        # Check for required columns (per requirements)
-        required = ["Order ID", "Shop", "MP EAN", "Quantity", "Shipping Label", 
-                   "Order Time", "Batch Type", "Batch Number", "Order Status"]
+            print(f"   {_COL[i]}: {header}", file=out)
         
-        missing = [h for h in required if h not in headers]
+        # Check for required columns
+        missing = [h for h in _REQUIRED if h not in header_set]
         if missing:
-            print(f"\n❌ Missing columns: {missing}")
+            print(f"\n❌ Missing columns: {missing}", file=out)
         else:
-            print(f"\n✅ All required columns present")
+            print(f"\n✅ All required columns present", file=out)
         
         # Check for removed column
-        if "Customer Name" in headers:
-            print(f"❌ 'Customer Name' column still present (should be removed)")
+        if "Customer Name" in header_set:
+            print(f"❌ 'Customer Name' column still present (should be removed)", file=out)
         else:
-            print(f"✅ 'Customer Name' column removed")
+            print(f"✅ 'Customer Name' column removed", file=out)
         
         # Check Shop column
-        if "Shop" in headers:
-            shop_idx = headers.index("Shop")
-            print(f"\n🏪 Shop Column (Column {chr(65+shop_idx)}):")
-            
-            # Check first 5 data rows
-            shop_values = set()
-            for row_idx, row in enumerate(rows[1:], start=2):
-                if row_idx > 6:  # First 5 rows
-                    break
-                if any(cell for cell in row):
-                    shop_val = row[shop_idx] if shop_idx < len(row) else None
-                    if shop_val:
-                        shop_values.add(shop_val)
-                        print(f"   Row {row_idx}: {shop_val}")
+        if shop_idx is not None:
+            print(f"\n🏪 Shop Column (Column {_COL[shop_idx + 1]}):", file=out)
+            for line in shop_lines:
+                print(line, file=out)
             
             if shop_values:
-                print(f"✅ Shop values found: {sorted(shop_values)}")
+                print(f"✅ Shop values found: {sorted(shop_values)}", file=out)
             else:
-                print(f"⚠️  No shop values found in first rows")
+                print(f"⚠️  No shop values found in first rows", file=out)
         else:
-            print(f"❌ 'Shop' column missing")
+            print(f"❌ 'Shop' column missing", file=out)
         
         # Check ZPL labels
-        if "Shipping Label" in headers:
-            zpl_idx = headers.index("Shipping Label")
-            print(f"\n📦 Shipping Label Column (Column {chr(65+zpl_idx)}):")
-            
-            zpl_count = 0
-            empty_count = 0
-            for row_idx, row in enumerate(rows[1:], start=2):
-                if row_idx > 10:  # Check first 10 rows
-                    break
-                if any(cell for cell in row):
-                    zpl_val = row[zpl_idx] if zpl_idx < len(row) else None
-                    if zpl_val:
-                        zpl_count += 1
-                        zpl_str = str(zpl_val)
-                        if len(zpl_str) > 50:
-                            print(f"   Row {row_idx}: ZPL present ({len(zpl_str)} chars) - {zpl_str[:50]}...")
-                        else:
-                            print(f"   Row {row_idx}: ZPL present ({len(zpl_str)} chars)")
-                    else:
-                        empty_count += 1
+        if zpl_idx is not None:
+            print(f"\n📦 Shipping Label Column (Column {_COL[zpl_idx + 1]}):", file=out)
+            for line in zpl_lines:
+                print(line, file=out)
             
             if zpl_count > 0:
-                print(f"✅ ZPL labels found: {zpl_count} rows with labels")
+                print(f"✅ ZPL labels found: {zpl_count} rows with labels", file=out)
             else:
-                print(f"⚠️  No ZPL labels found in first rows ({empty_count} empty)")
+                print(f"⚠️  No ZPL labels found in first rows ({empty_count} empty)", file=out)
         else:
-            print(f"❌ 'Shipping Label' column missing")
+            print(f"❌ 'Shipping Label' column missing", file=out)
         
-        # Count total rows
-        total_rows = len([row for row in rows[1:] if any(cell for cell in row)])
-        print(f"\n📊 Total data rows: {total_rows}")
+        print(f"\n📊 Total data rows: {total_rows}", file=out)
         
         return True
         
     except Exception as e:
-        print(f"❌ Error: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ Error: {e}", file=out)
+        traceback.print_exc(file=out)
         return False
 
+def _test_csv_file_buffered(file_path):
+    """Run test_csv_file into a private buffer so parallel reports don't interleave"""
+    buffer = io.StringIO()
+    result = test_csv_file(file_path, out=buffer)
+    return result, buffer.getvalue()
+
 def main():
     print("="*80)
     print("QUICK SYSTEM TEST")
@@ -143,7 +163,7 @@ def main():
     
     # Test latest file
     if csv_files:
-        latest = csv_files[0]
+        latest, _mtime, _size = csv_files[0]
         print(f"\n   Testing latest file: {os.path.basename(latest)}")
         test_csv_file(latest)
     
@@ -152,8 +172,11 @@ def main():
         print(f"\n\n{'='*80}")
         print(f"Testing all {len(csv_files)} files...")
         print('='*80)
-        for file_path in csv_files[:5]:  # Test first 5
-            test_csv_file(file_path)
+        # Test first 5 in parallel (I/O bound); reports are printed in order
+        to_test = [file_path for file_path, _mtime, _size in csv_files[:5]]
+        with ThreadPoolExecutor(max_workers=len(to_test)) as executor:
+            for _result, report in executor.map(_test_csv_file_buffered, to_test):
+                print(report, end="")
     
     print("\n" + "="*80)
     print("✅ Test complete!")
@@ -4,8 +4,14 @@ Complete Test Script - Test All System Components
 This script tests all major components of the Bol.com order processing system.
 """
 
+import io
+import socket
 import sys
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
 
 # Setup logging
@@ -15,6 +21,89 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Dependencies are imported once here; a test whose dependency is missing or broken
+# fails straight away with the stored import error, and the other tests still run.
+# Project modules can fail with any error (bad config, DB module bug), not just ImportError
+try:
+    import config
+    CONFIG_IMPORT_ERROR = None
+except Exception as e:
+    config = None
+    CONFIG_IMPORT_ERROR = e
+
+try:
+    from config_manager import load_config, get_config_summary, get_active_bol_accounts
+    CONFIG_MANAGER_IMPORT_ERROR = None
+except Exception as e:
+    load_config = get_config_summary = get_active_bol_accounts = None
+    CONFIG_MANAGER_IMPORT_ERROR = e
+
+try:
+    from order_database import init_database, get_processed_count, get_processed_orders_summary
+    DATABASE_IMPORT_ERROR = None
+except Exception as e:
+    init_database = get_processed_count = get_processed_orders_summary = None
+    DATABASE_IMPORT_ERROR = e
+
+try:
+    from batch_files import find_csv_files
+    BATCH_FILES_IMPORT_ERROR = None
+except Exception as e:
+    find_csv_files = None
+    BATCH_FILES_IMPORT_ERROR = e
+
+try:
+    import paramiko
+    PARAMIKO_IMPORT_ERROR = None
+except ImportError as e:
+    paramiko = None
+    PARAMIKO_IMPORT_ERROR = e
+
+try:
+    from bol_api_client import BolAPIClient
+    API_CLIENT_IMPORT_ERROR = None
+except ImportError as e:
+    BolAPIClient = None
+    API_CLIENT_IMPORT_ERROR = e
+
+try:
+    from status_callback_handler import fetch_callback_files_sftp
+    CALLBACK_HANDLER_IMPORT_ERROR = None
+except ImportError as e:
+    fetch_callback_files_sftp = None
+    CALLBACK_HANDLER_IMPORT_ERROR = e
+
+# SFTP and callback tests both open transports to the same host; run them one at a time
+_SFTP_SLOT = threading.Semaphore(1)
+
+# Connectivity probes should fail fast; the 30s production timeouts would hold up the run
+PROBE_CONNECT_TIMEOUT = 5
+PROBE_HANDSHAKE_TIMEOUT = 3
+
+
+class _PerThreadStdout(io.TextIOBase):
+    """sys.stdout proxy that routes each worker thread's prints to its own buffer"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        return (buffer if buffer is not None else self.stream).write(text)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    @contextmanager
+    def capture(self):
+        """Capture everything printed by the current thread"""
+        self._local.buffer = io.StringIO()
+        try:
+            yield self._local.buffer
+        finally:
+            self._local.buffer = None
+
 
 def test_api_connection():
     """Test Bol.com API connection"""
@@ -22,11 +111,12 @@ def test_api_connection():
     print("TEST 1: Bol.com API Connection")
     print("="*80)
     
+    if BolAPIClient is None or config is None:
+        print(f"❌ API Connection Failed: {API_CLIENT_IMPORT_ERROR or CONFIG_IMPORT_ERROR}")
+        return False
+    
     try:
-        from bol_api_client import BolAPIClient
-        from config import BOL_CLIENT_ID, BOL_CLIENT_SECRET
-        
-        client = BolAPIClient(BOL_CLIENT_ID, BOL_CLIENT_SECRET, test_mode=True)
+        client = BolAPIClient(config.BOL_CLIENT_ID, config.BOL_CLIENT_SECRET, test_mode=True)
         orders = client.get_all_open_orders()
         
         print(f"✅ API Connection OK")
@@ -43,9 +133,11 @@ def test_database():
     print("TEST 2: Database")
     print("="*80)
     
+    if init_database is None:
+        print(f"❌ Database Test Failed: {DATABASE_IMPORT_ERROR}")
+        return False
+    
     try:
-        from order_database import init_database, get_processed_count, get_processed_orders_summary
-        
         init_database()
         count = get_processed_count()
         summary = get_processed_orders_summary()
@@ -65,30 +157,36 @@ def test_sftp_connection():
     print("TEST 3: SFTP Connection")
     print("="*80)
     
+    if paramiko is None or config is None:
+        print(f"❌ SFTP Connection Failed: {PARAMIKO_IMPORT_ERROR or CONFIG_IMPORT_ERROR}")
+        return False
+    
     try:
-        import paramiko
-        from config import SFTP_HOST, SFTP_PORT, SFTP_USERNAME, SFTP_PASSWORD
-        
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30  # Increase banner timeout
-        transport.auth_timeout = 30    # Increase auth timeout
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
+        with _SFTP_SLOT:
+            # Open the socket ourselves so the connect timeout applies to this probe only
+            # (socket.setdefaulttimeout would also affect the tests running alongside it)
+            sock = socket.create_connection((config.SFTP_HOST, config.SFTP_PORT),
+                                            timeout=PROBE_CONNECT_TIMEOUT)
+            transport = paramiko.Transport(sock)
+            transport.banner_timeout = PROBE_HANDSHAKE_TIMEOUT
+            transport.auth_timeout = PROBE_HANDSHAKE_TIMEOUT
+            transport.connect(username=config.SFTP_USERNAME, password=config.SFTP_PASSWORD)
+            sftp = paramiko.SFTPClient.from_transport(transport)
         
-        # Test listing directory
-        try:
-            sftp.listdir("/data/sites/web/trivium-ecommercecom/FTP/Batches")
-            print(f"✅ SFTP Connection OK")
-            print(f"   Host: {SFTP_HOST}:{SFTP_PORT}")
-            print(f"   Username: {SFTP_USERNAME}")
-            sftp.close()
-            transport.close()
-            return True
-        except Exception as e:
-            print(f"⚠️  SFTP Connected but directory access issue: {e}")
-            sftp.close()
-            transport.close()
-            return False
+            # Test listing directory
+            try:
+                sftp.listdir("/data/sites/web/trivium-ecommercecom/FTP/Batches")
+                print(f"✅ SFTP Connection OK")
+                print(f"   Host: {config.SFTP_HOST}:{config.SFTP_PORT}")
+                print(f"   Username: {config.SFTP_USERNAME}")
+                sftp.close()
+                transport.close()
+                return True
+            except Exception as e:
+                print(f"⚠️  SFTP Connected but directory access issue: {e}")
+                sftp.close()
+                transport.close()
+                return False
             
     except Exception as e:
         print(f"❌ SFTP Connection Failed: {e}")
@@ -101,17 +199,16 @@ def test_email_config():
     print("TEST 4: Email Configuration")
     print("="*80)
     
+    if config is None:
+        print(f"❌ Email Configuration Error: {CONFIG_IMPORT_ERROR}")
+        return False
+    
     try:
-        from config import (
-            EMAIL_SMTP_HOST, EMAIL_SMTP_PORT, EMAIL_USERNAME,
-            EMAIL_FROM, EMAIL_RECIPIENTS
-        )
-        
         print(f"✅ Email Configuration OK")
-        print(f"   SMTP Host: {EMAIL_SMTP_HOST}")
-        print(f"   SMTP Port: {EMAIL_SMTP_PORT}")
-        print(f"   From: {EMAIL_FROM}")
-        print(f"   Recipients: {len(EMAIL_RECIPIENTS)}")
+        print(f"   SMTP Host: {config.EMAIL_SMTP_HOST}")
+        print(f"   SMTP Port: {config.EMAIL_SMTP_PORT}")
+        print(f"   From: {config.EMAIL_FROM}")
+        print(f"   Recipients: {len(config.EMAIL_RECIPIENTS)}")
         print(f"   Note: Actual email sending requires valid credentials")
         return True
     except Exception as e:
@@ -125,9 +222,11 @@ def test_config_manager():
     print("TEST 5: Configuration Manager")
     print("="*80)
     
+    if load_config is None:
+        print(f"❌ Configuration Manager Error: {CONFIG_MANAGER_IMPORT_ERROR}")
+        return False
+    
     try:
-        from config_manager import load_config, get_config_summary, get_active_bol_accounts
-        
         config = load_config()
         summary = get_config_summary()
         active_accounts = get_active_bol_accounts()
@@ -148,14 +247,16 @@ def test_callback_handler():
     print("TEST 6: Status Callback Handler")
     print("="*80)
     
+    if fetch_callback_files_sftp is None:
+        print(f"❌ Callback Handler Error: {CALLBACK_HANDLER_IMPORT_ERROR}")
+        return False
+    
     try:
-        import time
-        from status_callback_handler import fetch_callback_files_sftp
-        
-        # Small delay to avoid connection limit issues
-        time.sleep(2)
-        
-        files = fetch_callback_files_sftp()
+        with _SFTP_SLOT:
+            # Small delay to avoid connection limit issues
+            time.sleep(2)
+            
+            files = fetch_callback_files_sftp()
         
         print(f"✅ Callback Handler OK")
         print(f"   Found {len(files)} HTML files in callback directory")
@@ -175,16 +276,16 @@ def test_csv_generation():
     print("TEST 7: CSV File Generation")
     print("="*80)
     
+    if find_csv_files is None:
+        print(f"❌ CSV Generation Test Error: {BATCH_FILES_IMPORT_ERROR}")
+        return False
+    
     try:
-        import glob
-        import os
-        
-        pattern = "batches/**/*.csv"
-        files = glob.glob(pattern, recursive=True)
+        # (path, mtime, size) tuples, newest first
+        files = find_csv_files()
         
         if files:
-            latest = max(files, key=os.path.getmtime)
-            size = os.path.getsize(latest)
+            latest, _mtime, size = files[0]
             print(f"✅ CSV Files Found")
             print(f"   Total files: {len(files)}")
             print(f"   Latest: {latest}")
@@ -199,6 +300,24 @@ def test_csv_generation():
         return False
 
 
+TESTS = [
+    ('api', test_api_connection),
+    ('database', test_database),
+    ('sftp', test_sftp_connection),
+    ('email', test_email_config),
+    ('config', test_config_manager),
+    ('callback', test_callback_handler),
+    ('csv', test_csv_generation),
+]
+
+
+def _run_captured(stdout, test_func):
+    """Run a test in a worker thread and return (result, printed output)"""
+    with stdout.capture() as buffer:
+        result = test_func()
+    return result, buffer.getvalue()
+
+
 def main():
     """Run all tests"""
     print("="*80)
@@ -206,16 +325,25 @@ def main():
     print("="*80)
     print(f"Test started at: {datetime.now()}")
     
-    results = {}
+    # Run all tests concurrently; network-bound ones (API, SFTP, callbacks) overlap
+    # and each test's output is printed as one block when it finishes
+    outcomes = {}
+    stdout = _PerThreadStdout(sys.stdout)
+    sys.stdout = stdout
+    try:
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(_run_captured, stdout, test_func): name
+                for name, test_func in TESTS
+            }
+            for future in as_completed(futures):
+                result, output = future.result()
+                stdout.stream.write(output)
+                outcomes[futures[future]] = result
+    finally:
+        sys.stdout = stdout.stream
     
-    # Run all tests
-    results['api'] = test_api_connection()
-    results['database'] = test_database()
-    results['sftp'] = test_sftp_connection()
-    results['email'] = test_email_config()
-    results['config'] = test_config_manager()
-    results['callback'] = test_callback_handler()
-    results['csv'] = test_csv_generation()
+    results = {name: outcomes[name] for name, _ in TESTS}
     
     # Summary
     print("\n" + "="*80)
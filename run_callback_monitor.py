@@ -3,10 +3,15 @@ Continuous Callback Monitor
 Monitors FTP/Callbacks directory every minute and processes status files automatically
 """
 
+import json
+import os
+import signal
+import threading
 import time
 import logging
 from datetime import datetime
-from status_callback_handler import process_callback_files
+import status_callback_handler
+from status_callback_handler import PersistentSFTP, process_callback_files
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +20,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Order of the running totals kept by run_continuous_monitor
+STAT_KEYS = ('processed', 'updated', 'labels_deleted', 'ignored', 'errors')
+TOTALS_FORMAT = "files=%d updated=%d labels_deleted=%d ignored=%d errors=%d"
+SEP = "=" * 80
+
+# Check count and totals survive restarts here (written after every cycle)
+STATE_FILE = "callback_monitor_state.json"
+
+
+def _load_state():
+    """Return (cycle_count, totals) saved by a previous run, or zeros"""
+    try:
+        with open(STATE_FILE, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        totals = [int(state['totals'].get(key, 0)) for key in STAT_KEYS]
+        return int(state['cycle_count']), totals
+    except FileNotFoundError:
+        pass
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.warning("Ignoring unreadable %s: %s", STATE_FILE, e)
+    return 0, [0] * len(STAT_KEYS)
+
+
+def _save_state(cycle_count, totals):
+    """Write the counters atomically so a crash mid-write cannot corrupt them"""
+    state = {
+        'cycle_count': cycle_count,
+        'totals': dict(zip(STAT_KEYS, totals)),
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+    }
+    tmp_path = STATE_FILE + ".tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, STATE_FILE)
+    except OSError as e:
+        logger.warning("Could not save %s: %s", STATE_FILE, e)
+
+
+# Set by SIGTERM/SIGINT so the monitor wakes from its wait immediately and
+# shuts down cleanly, rather than only noticing between sleeps
+stop_event = threading.Event()
+
+
+def _request_stop(signum, frame):
+    logger.info("🛑 Received signal %d, stopping monitor", signum)
+    stop_event.set()
+
+
+def _log_final_stats(reason: str, cycle_count: int, totals) -> None:
+    logger.info(
+        "\n\n%s\n%s\n%s\n\nFinal Statistics:\n"
+        "  Total checks performed: %d\n"
+        "  Totals: " + TOTALS_FORMAT + "\n%s",
+        SEP, reason, SEP, cycle_count, *totals, SEP,
+    )
+
 
 def run_continuous_monitor(check_interval: int = 60):
     """
@@ -23,118 +85,113 @@ def run_continuous_monitor(check_interval: int = 60):
     Args:
         check_interval: Time in seconds between checks (default: 60 = 1 minute)
     """
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info("BOL.COM CALLBACK MONITOR - CONTINUOUS MODE")
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info(f"Monitoring FTP/Callbacks directory")
     logger.info(f"Check interval: {check_interval} seconds ({check_interval//60} minute(s))")
     logger.info(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info("\n🔍 Monitor started. Press Ctrl+C to stop.\n")
     
-    cycle_count = 0
-    total_stats = {
-        'total_processed': 0,
-        'total_updated': 0,
-        'total_labels_deleted': 0,
-        'total_ignored': 0,
-        'total_errors': 0
-    }
+    cycle_count, totals = _load_state()
+    if cycle_count:
+        logger.info("Resuming counters from %s: %d checks so far", STATE_FILE, cycle_count)
+    
+    # Keep one SFTP connection open for the monitor's lifetime instead of
+    # reconnecting for every fetch/archive/label delete in every cycle
+    status_callback_handler.SFTP_POOL = PersistentSFTP(keepalive=30)
+    
+    stop_event.clear()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _request_stop)
+        signal.signal(signal.SIGINT, _request_stop)
     
     try:
-        while True:
+        while not stop_event.is_set():
+            # Deadline is fixed before the check runs, so a slow cycle shortens
+            # the following sleep instead of pushing every later check back
+            deadline = time.monotonic() + check_interval
             cycle_count += 1
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
-            logger.info(f"\n{'='*80}")
-            logger.info(f"⏰ Check #{cycle_count} at {timestamp}")
-            logger.info(f"{'='*80}")
+            # Each cycle logs one header, one results record and one footer record
+            # instead of a separate record (and stream write) per line
+            logger.info("\n%s\n⏰ Check #%d at %s\n%s",
+                        SEP, cycle_count, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), SEP)
             
+            found_files = False
             try:
                 # Process callback files
                 stats = process_callback_files()
                 
                 # Update totals
-                total_stats['total_processed'] += stats['processed']
-                total_stats['total_updated'] += stats['updated']
-                total_stats['total_labels_deleted'] += stats.get('labels_deleted', 0)
-                total_stats['total_ignored'] += stats['ignored']
-                total_stats['total_errors'] += stats['errors']
+                totals = [total + stats.get(key, 0) for total, key in zip(totals, STAT_KEYS)]
                 
-                # Log results
+                # Log results right away so monitoring sees them without waiting for the footer
                 if stats['processed'] > 0:
-                    logger.info(f"\n📊 Cycle #{cycle_count} Results:")
-                    logger.info(f"   Files processed: {stats['processed']}")
-                    logger.info(f"   Orders updated: {stats['updated']}")
-                    logger.info(f"   Labels deleted: {stats.get('labels_deleted', 0)}")
-                    logger.info(f"   Ignored: {stats['ignored']}")
-                    logger.info(f"   Errors: {stats['errors']}")
-                else:
-                    logger.info("   No callback files found")
+                    found_files = True
+                    logger.info(
+                        "\n📊 Cycle #%d Results:\n"
+                        "   Files processed: %d\n"
+                        "   Orders updated: %d\n"
+                        "   Labels deleted: %d\n"
+                        "   Ignored: %d\n"
+                        "   Errors: %d",
+                        cycle_count, stats['processed'], stats['updated'],
+                        stats.get('labels_deleted', 0), stats['ignored'], stats['errors'],
+                    )
                 
             except Exception as e:
-                logger.error(f"❌ Error during cycle #{cycle_count}: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.exception("❌ Error during cycle #%d: %s", cycle_count, e)
             
-            # Show cumulative stats
-            logger.info(f"\n📈 Cumulative Totals (since start):")
-            logger.info(f"   Total files: {total_stats['total_processed']}")
-            logger.info(f"   Total orders updated: {total_stats['total_updated']}")
-            logger.info(f"   Total labels deleted: {total_stats['total_labels_deleted']}")
-            logger.info(f"   Total ignored: {total_stats['total_ignored']}")
-            logger.info(f"   Total errors: {total_stats['total_errors']}")
+            _save_state(cycle_count, totals)
             
-            # Wait for next check
-            next_check = datetime.now()
-            next_check = next_check.replace(second=0, microsecond=0)
-            from datetime import timedelta
-            next_check = next_check + timedelta(seconds=check_interval)
+            # Cumulative stats and next check time
+            remaining = deadline - time.monotonic()
+            logger.info(
+                "%s\n📈 Cumulative Totals (all runs): " + TOTALS_FORMAT + "\n\n⏳ Next check in %.0f seconds\n%s\n",
+                "" if found_files else "   No callback files found\n",
+                *totals, max(0, remaining), SEP,
+            )
             
-            logger.info(f"\n⏳ Next check at: {next_check.strftime('%H:%M:%S')}")
-            logger.info(f"{'='*80}\n")
-            
-            time.sleep(check_interval)
+            if remaining > 0:
+                stop_event.wait(remaining)
+        
+        _log_final_stats("🛑 Monitor stopped", cycle_count, totals)
             
     except KeyboardInterrupt:
-        logger.info("\n\n" + "="*80)
-        logger.info("🛑 Monitor stopped by user")
-        logger.info("="*80)
-        logger.info(f"\nFinal Statistics:")
-        logger.info(f"  Total checks performed: {cycle_count}")
-        logger.info(f"  Total files processed: {total_stats['total_processed']}")
-        logger.info(f"  Total orders updated: {total_stats['total_updated']}")
-        logger.info(f"  Total labels deleted: {total_stats['total_labels_deleted']}")
-        logger.info(f"  Total ignored: {total_stats['total_ignored']}")
-        logger.info(f"  Total errors: {total_stats['total_errors']}")
-        logger.info("="*80)
+        _log_final_stats("🛑 Monitor stopped by user", cycle_count, totals)
+    finally:
+        status_callback_handler.SFTP_POOL.close()
+        status_callback_handler.SFTP_POOL = None
 
 
 def run_single_check():
     """
     Run a single callback check (for testing or manual execution).
     """
-    logger.info("="*80)
+    logger.info(SEP)
     logger.info("BOL.COM CALLBACK MONITOR - SINGLE CHECK MODE")
-    logger.info("="*80)
+    logger.info(SEP)
     
     try:
         stats = process_callback_files()
         
-        logger.info("\n📊 Results:")
-        logger.info(f"   Files processed: {stats['processed']}")
-        logger.info(f"   Orders updated: {stats['updated']}")
-        logger.info(f"   Labels deleted: {stats.get('labels_deleted', 0)}")
-        logger.info(f"   Ignored: {stats['ignored']}")
-        logger.info(f"   Errors: {stats['errors']}")
-        logger.info("="*80)
+        logger.info(
+            "\n📊 Results:\n"
+            "   Files processed: %d\n"
+            "   Orders updated: %d\n"
+            "   Labels deleted: %d\n"
+            "   Ignored: %d\n"
+            "   Errors: %d\n%s",
+            stats['processed'], stats['updated'], stats.get('labels_deleted', 0),
+            stats['ignored'], stats['errors'], SEP,
+        )
         
         return stats
         
     except Exception as e:
-        logger.error(f"❌ Error during check: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error during check: %s", e)
         return None
 
 
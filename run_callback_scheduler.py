@@ -27,14 +27,16 @@ def run_continuous(interval_seconds: int = 60) -> None:
     
     try:
         while True:
+            deadline = time.monotonic() + interval_seconds
             try:
                 run_callback_processor()
             except Exception as e:
                 logger.error(f"Error in callback processor: {e}")
             
-            # Wait for next interval
-            logger.debug(f"Waiting {interval_seconds} seconds until next check...")
-            time.sleep(interval_seconds)
+            # Wait for next interval (processing time counts towards it)
+            remaining = max(0, deadline - time.monotonic())
+            logger.debug(f"Waiting {remaining:.0f} seconds until next check...")
+            time.sleep(remaining)
             
     except KeyboardInterrupt:
         logger.info("\nScheduler stopped by user.")
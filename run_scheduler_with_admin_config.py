@@ -3,12 +3,14 @@ Enhanced Scheduler with Admin Panel Configuration
 Uses configuration from the admin panel to schedule order processing
 """
 
+import os
 import schedule
 import time
 import logging
+import traceback
 from datetime import datetime
 from admin_config_reader import AdminConfigReader
-from order_processing import process_all_orders
+from order_processing import run_processing_once
 
 # Configure logging
 logging.basicConfig(
@@ -17,19 +19,49 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+ADMIN_CONFIG_FILE = "admin_config.json"
+
+# Longest the scheduler sleeps between wakes; also how quickly admin config
+# changes are picked up
+MAX_IDLE_SECONDS = 300
+
+# Parsed admin config, reused until the file's mtime/size changes
+_config_cache = {'signature': None, 'reader': None}
+
+# Signature of the config file the scheduled jobs were built from. Kept apart from
+# _config_cache, which jobs refresh too, so a job running first can't hide an edit
+_jobs_signature = None
+
+
+def _config_signature():
+    """Return (mtime_ns, size) of the admin config file, or None if it is missing"""
+    try:
+        st = os.stat(ADMIN_CONFIG_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def get_config() -> AdminConfigReader:
+    """Return an AdminConfigReader, re-reading the file only when it has changed"""
+    signature = _config_signature()
+    if _config_cache['reader'] is None or signature != _config_cache['signature']:
+        _config_cache['reader'] = AdminConfigReader(ADMIN_CONFIG_FILE)
+        _config_cache['signature'] = signature
+    return _config_cache['reader']
+
 
 def process_orders_if_enabled():
     """Process orders only if enabled for today"""
-    config = AdminConfigReader()
+    config = get_config()
     
     if config.is_processing_enabled_today():
         logger.info("📅 Processing enabled for today - Running order processing...")
         try:
-            process_all_orders()
+            run_processing_once()
             logger.info("✅ Order processing completed successfully")
         except Exception as e:
             logger.error(f"❌ Error during order processing: {e}")
-            import traceback
             traceback.print_exc()
     else:
         today = datetime.now().strftime('%A')
@@ -38,7 +70,10 @@ def process_orders_if_enabled():
 
 def setup_scheduler():
     """Setup scheduler with times from admin configuration"""
-    config = AdminConfigReader()
+    global _jobs_signature
+    # Take the signature before reading, so an edit made while reading is seen next time
+    _jobs_signature = _config_signature()
+    config = get_config()
     processing_times = config.get_processing_times()
     weekly_schedule = config.get_weekly_schedule()
     
@@ -74,21 +109,32 @@ def setup_scheduler():
     logger.info("\n🔍 Scheduler started. Press Ctrl+C to stop.\n")
 
 
+def reload_scheduler_if_changed() -> bool:
+    """Rebuild the jobs if the admin config changed since they were set up; returns True if rebuilt"""
+    if _config_signature() == _jobs_signature:
+        return False
+    logger.info("🔄 Reloading configuration from admin panel...")
+    schedule.clear()
+    setup_scheduler()
+    return True
+
+
 def run_scheduler():
     """Run the scheduler continuously"""
     setup_scheduler()
     
     try:
         while True:
+            # Sleep until the next job is due instead of waking every minute
+            idle = schedule.idle_seconds()
+            if idle is None:
+                idle = MAX_IDLE_SECONDS
+            time.sleep(min(max(idle, 0), MAX_IDLE_SECONDS))
             schedule.run_pending()
-            time.sleep(60)  # Check every minute
             
-            # Reload configuration every hour to pick up admin changes
-            current_minute = datetime.now().minute
-            if current_minute == 0:
-                logger.info("🔄 Reloading configuration from admin panel...")
-                schedule.clear()
-                setup_scheduler()
+            # Pick up admin changes; the jobs are only rebuilt when the admin
+            # config file changed since they were built
+            reload_scheduler_if_changed()
                 
     except KeyboardInterrupt:
         logger.info("\n\n" + "="*80)
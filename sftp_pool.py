@@ -0,0 +1,129 @@
+"""
+SFTP Connections
+
+open_sftp()/sftp_session() hold the one copy of the connect + authenticate code,
+and SFTPPool keeps a bounded number of connections open so several uploads can
+share them instead of each doing its own SSH handshake.
+"""
+
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+import paramiko
+
+from config import SFTP_HOST, SFTP_PORT, SFTP_USERNAME, SFTP_PASSWORD, SFTP_PRIVATE_KEY_PATH
+
+logger = logging.getLogger(__name__)
+
+# SSH channel window; paramiko's ~2 MB default limits throughput on high-latency links.
+# The packet size stays at the 32 KB that every server must accept
+SFTP_WINDOW_SIZE = 4 * 1024 * 1024
+
+
+def open_sftp(host: str = SFTP_HOST, port: int = SFTP_PORT,
+              username: str = SFTP_USERNAME, password: str = SFTP_PASSWORD,
+              key_path: Optional[str] = SFTP_PRIVATE_KEY_PATH):
+    """
+    Connect and authenticate to the SFTP server.
+    
+    Key authentication is tried first when key_path is set (no password check on
+    the server side); the password is used if there is no key or it is refused.
+    
+    Returns:
+        (paramiko.Transport, paramiko.SFTPClient); the caller closes both
+    """
+    transport = paramiko.Transport((host, port), default_window_size=SFTP_WINDOW_SIZE)
+    transport.banner_timeout = 30  # Increase banner timeout
+    transport.auth_timeout = 30    # Increase auth timeout
+    try:
+        transport.start_client()
+        if key_path:
+            try:
+                transport.auth_publickey(username, paramiko.PKey.from_path(key_path))
+            except (OSError, paramiko.SSHException) as e:
+                logger.warning("SFTP key authentication failed (%s), using password", e)
+        if not transport.is_authenticated():
+            transport.auth_password(username, password)
+        return transport, paramiko.SFTPClient.from_transport(transport)
+    except Exception:
+        transport.close()
+        raise
+
+
+def close_sftp(transport, sftp) -> None:
+    """Close an SFTP client and its transport, ignoring errors"""
+    for conn in (sftp, transport):
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+@contextmanager
+def sftp_session(**kwargs):
+    """Yield a paramiko.SFTPClient from open_sftp(**kwargs), closed on exit"""
+    transport, sftp = open_sftp(**kwargs)
+    try:
+        yield sftp
+    finally:
+        close_sftp(transport, sftp)
+
+
+class SFTPPool:
+    """Bounded pool of SFTP connections that can be shared between threads"""
+
+    def __init__(self, host: str, port: int, username: str, password: str, size: int = 4):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _open(self):
+        conn = open_sftp(self.host, self.port, self.username, self.password)
+        logger.info("Connected to SFTP server: %s:%d", self.host, self.port)
+        return conn
+
+    @staticmethod
+    def _close(conn) -> None:
+        close_sftp(*conn)
+
+    def _take(self):
+        """Return an idle live connection, or open a new one"""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            if conn[0].is_active():
+                return conn
+            self._close(conn)
+
+    @contextmanager
+    def acquire(self):
+        """Borrow a paramiko.SFTPClient; blocks while all connections are in use"""
+        with self._slots:
+            conn = self._take()
+            try:
+                yield conn[1]
+            except (paramiko.SSHException, EOFError, OSError):
+                # Don't hand a possibly broken connection to the next caller
+                self._close(conn)
+                conn = None
+                raise
+            finally:
+                if conn is not None:
+                    self._idle.put(conn)
+
+    def close(self) -> None:
+        """Close all idle connections"""
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
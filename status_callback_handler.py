@@ -6,20 +6,22 @@ Monitors FTP directory for HTML status files and updates Bol.com orders when "ve
 
 import os
 import re
+import stat
+import time
 import logging
 import paramiko
-from typing import List, Dict, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Iterator, List, Dict, Optional
 from datetime import datetime
 
 from bol_api_client import BolAPIClient
+from sftp_pool import open_sftp, close_sftp, sftp_session
 from config import (
     BOL_CLIENT_ID,
     BOL_CLIENT_SECRET,
     TEST_MODE,
-    SFTP_HOST,
-    SFTP_PORT,
-    SFTP_USERNAME,
-    SFTP_PASSWORD,
     SFTP_REMOTE_LABEL_DIR,
 )
 
@@ -29,6 +31,142 @@ logger = logging.getLogger(__name__)
 SFTP_CALLBACK_DIR = "/data/sites/web/trivium-ecommercecom/FTP/Callbacks"
 SFTP_LABEL_DIR = SFTP_REMOTE_LABEL_DIR  # Use the same path as label_uploader
 
+# Order ID patterns for callback HTML, most specific first; Bol.com order IDs are
+# typically alphanumeric, e.g. "A000C2F77M". The ID groups must start at a
+# non-alphanumeric boundary and the tag pattern cannot cross another '<', so
+# broken or unusual HTML fails in linear time instead of retrying every offset.
+_ORDER_ID_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'order[_\s-]?id["\']?\s*[:=]\s*["\']?([A-Z0-9]{10,})',  # order_id: "A000C2F77M"
+    r'order["\']?\s*[:=]\s*["\']?([A-Z0-9]{10,})',  # order: "A000C2F77M"
+    r'<[^<>]*>([A-Z0-9]{10,})</',  # <td>A000C2F77M</td>
+    r'(?<![A-Z0-9])([A-Z0-9]{10,})',  # Just find any 10+ char alphanumeric (fallback)
+))
+
+# Order IDs are searched for in this many leading characters of a callback file
+ORDER_ID_SEARCH_CHARS = 65536
+
+# Shipping status in callback HTML; group 1 is set for "niet verzonden"
+_STATUS_RE = re.compile(r'(niet\s+)?verzonden', re.IGNORECASE)
+_NOT_SHIPPED_RE = re.compile(r'niet\s+verzonden', re.IGNORECASE)
+
+# Callback files opened and prefetched ahead of the one being processed
+CALLBACK_READ_AHEAD = 8
+
+# Shipment updates sent to Bol.com at the same time; kept small for the API rate limit
+SHIPMENT_UPDATE_WORKERS = 4
+
+# Optional shared connection (a PersistentSFTP) set by long-running monitors;
+# when None every SFTP operation opens and closes its own connection
+SFTP_POOL = None
+
+# API client reused across callback runs so its OAuth token and HTTP session are kept
+_api_client: Optional[BolAPIClient] = None
+
+
+def _get_api_client() -> BolAPIClient:
+    global _api_client
+    if _api_client is None:
+        _api_client = BolAPIClient(BOL_CLIENT_ID, BOL_CLIENT_SECRET, test_mode=TEST_MODE)
+    return _api_client
+
+
+class PersistentSFTP:
+    """Single SFTP connection kept open across callback cycles, reopened when it drops"""
+    
+    # Wait after a failed connect before trying again; doubles per consecutive failure
+    RETRY_BASE_SECONDS = 5
+    RETRY_MAX_SECONDS = 300
+    
+    def __init__(self, keepalive: int = 30):
+        self.keepalive = keepalive
+        self._transport = None
+        self._sftp = None
+        self._failures = 0
+        self._retry_at = 0.0
+    
+    def get(self) -> paramiko.SFTPClient:
+        if self._sftp is None or not self._transport.is_active():
+            self.close()
+            # While the server is unreachable, fail fast instead of paying the
+            # connect/banner timeouts again for every operation
+            if time.monotonic() < self._retry_at:
+                raise paramiko.SSHException("SFTP server unavailable, waiting before reconnecting")
+            try:
+                self._transport, self._sftp = open_sftp()
+            except Exception:
+                self._failures += 1
+                delay = min(self.RETRY_BASE_SECONDS * 2 ** (self._failures - 1), self.RETRY_MAX_SECONDS)
+                self._retry_at = time.monotonic() + delay
+                logger.warning("SFTP connect failed (%d in a row), next attempt in %ds", self._failures, delay)
+                raise
+            self._failures = 0
+            self._retry_at = 0.0
+            self._transport.set_keepalive(self.keepalive)
+            logger.info("Opened persistent SFTP connection")
+        return self._sftp
+    
+    def close(self) -> None:
+        close_sftp(self._transport, self._sftp)
+        self._transport = None
+        self._sftp = None
+
+
+@contextmanager
+def _sftp_session():
+    """Yield an SFTP client from SFTP_POOL if set, otherwise a connection closed on exit"""
+    if SFTP_POOL is not None:
+        try:
+            yield SFTP_POOL.get()
+        except (paramiko.SSHException, EOFError, OSError):
+            # Drop the broken connection so the next call reconnects
+            SFTP_POOL.close()
+            raise
+        return
+    
+    with sftp_session() as sftp:
+        yield sftp
+
+
+@contextmanager
+def _run_connection():
+    """
+    Share one SFTP connection for the duration of a processing run when no
+    SFTP_POOL is installed, so fetch, label deletes and archive don't each
+    reconnect.
+    """
+    global SFTP_POOL
+    if SFTP_POOL is not None:
+        yield
+        return
+    
+    SFTP_POOL = PersistentSFTP()
+    try:
+        yield
+    finally:
+        SFTP_POOL.close()
+        SFTP_POOL = None
+
+
+def _find_status(html_content: str) -> Optional[str]:
+    """Return 'verzonden', 'niet verzonden' or None for a callback file"""
+    # One case-insensitive pass instead of lowering the whole body per check;
+    # "niet verzonden" anywhere wins over "verzonden"
+    match = _STATUS_RE.search(html_content)
+    if not match:
+        return None
+    if match.group(1) or _NOT_SHIPPED_RE.search(html_content, match.end()):
+        return 'niet verzonden'
+    return 'verzonden'
+
+
+def _find_order_id(html_content: str) -> Optional[str]:
+    """Return the first order ID found by the precompiled patterns, or None"""
+    for pattern in _ORDER_ID_PATTERNS:
+        match = pattern.search(html_content, 0, ORDER_ID_SEARCH_CHARS)
+        if match:
+            return match.group(1)
+    return None
+
 
 def parse_html_status_file(html_content: str) -> Optional[Dict[str, str]]:
     """
@@ -43,28 +181,8 @@ def parse_html_status_file(html_content: str) -> Optional[Dict[str, str]]:
         Dictionary with 'order_id' and 'status', or None if parsing fails
     """
     try:
-        # Look for order ID (Bol.com order IDs are typically alphanumeric, e.g., "A000C2F77M")
-        # Pattern: Look for common order ID patterns
-        order_id_patterns = [
-            r'order[_\s-]?id["\']?\s*[:=]\s*["\']?([A-Z0-9]{10,})',  # order_id: "A000C2F77M"
-            r'order["\']?\s*[:=]\s*["\']?([A-Z0-9]{10,})',  # order: "A000C2F77M"
-            r'<[^>]*>([A-Z0-9]{10,})</',  # <td>A000C2F77M</td>
-            r'([A-Z0-9]{10,})',  # Just find any 10+ char alphanumeric (fallback)
-        ]
-        
-        order_id = None
-        for pattern in order_id_patterns:
-            match = re.search(pattern, html_content, re.IGNORECASE)
-            if match:
-                order_id = match.group(1)
-                break
-        
-        # Look for status
-        status = None
-        if 'verzonden' in html_content.lower():
-            status = 'verzonden'
-        elif 'niet verzonden' in html_content.lower():
-            status = 'niet verzonden'
+        order_id = _find_order_id(html_content)
+        status = _find_status(html_content)
         
         if order_id and status:
             return {
@@ -130,65 +248,48 @@ def delete_label_pdf_from_ftp(order_id: str) -> bool:
     Returns:
         True if deleted successfully or file not found, False if error
     """
-    transport = None
-    sftp = None
-    
     try:
-        # Connect to SFTP
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30
-        transport.auth_timeout = 30
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        
-        # Try to find PDF files that match this order ID
-        try:
-            files = sftp.listdir(SFTP_LABEL_DIR)
-            pdf_files = [f for f in files if f.lower().endswith('.pdf') and order_id in f]
-            
-            if not pdf_files:
-                logger.info(f"No label PDF found for order {order_id} (may have been already deleted)")
-                return True  # Not an error if file doesn't exist
-            
-            # Delete all matching PDF files for this order
-            for pdf_file in pdf_files:
-                remote_path = f"{SFTP_LABEL_DIR}/{pdf_file}"
-                try:
-                    sftp.remove(remote_path)
-                    logger.info(f"🗑️  Deleted label PDF: {pdf_file}")
-                except Exception as e:
-                    logger.error(f"Error deleting {pdf_file}: {e}")
-                    return False
-            
-            return True
-            
-        except FileNotFoundError:
-            logger.warning(f"Label directory not found: {SFTP_LABEL_DIR}")
-            return True  # Not a critical error
+        with _sftp_session() as sftp:
+            # Try to find PDF files that match this order ID
+            try:
+                files = sftp.listdir(SFTP_LABEL_DIR)
+                pdf_files = [f for f in files if f.lower().endswith('.pdf') and order_id in f]
+                
+                if not pdf_files:
+                    logger.info(f"No label PDF found for order {order_id} (may have been already deleted)")
+                    return True  # Not an error if file doesn't exist
+                
+                # Delete all matching PDF files for this order
+                for pdf_file in pdf_files:
+                    remote_path = f"{SFTP_LABEL_DIR}/{pdf_file}"
+                    try:
+                        sftp.remove(remote_path)
+                        logger.info(f"🗑️  Deleted label PDF: {pdf_file}")
+                    except Exception as e:
+                        logger.error(f"Error deleting {pdf_file}: {e}")
+                        return False
+                
+                return True
+                
+            except FileNotFoundError:
+                logger.warning(f"Label directory not found: {SFTP_LABEL_DIR}")
+                return True  # Not a critical error
             
     except Exception as e:
         logger.error(f"Error connecting to SFTP to delete label: {e}")
         return False
-    finally:
-        if sftp:
-            try:
-                sftp.close()
-            except:
-                pass
-        if transport:
-            try:
-                transport.close()
-            except:
-                pass
 
 
-def update_order_status_shipped(client: BolAPIClient, order_id: str) -> bool:
+def update_order_status_shipped(client: BolAPIClient, order_id: str,
+                                delete_label: bool = True) -> bool:
     """
     Update Bol.com order status to shipped.
     
     Args:
         client: Bol.com API client
         order_id: Bol.com order ID
+        delete_label: Also delete the order's label PDF from FTP after the update
+            (callers updating from several threads pass False and delete afterwards)
         
     Returns:
         True if successful, False otherwise
@@ -209,7 +310,8 @@ def update_order_status_shipped(client: BolAPIClient, order_id: str) -> bool:
             logger.info(f"✅ Successfully updated order {order_id} (shipment {shipment_id}) to shipped")
             
             # Delete the corresponding PDF label from FTP
-            delete_label_pdf_from_ftp(order_id)
+            if delete_label:
+                delete_label_pdf_from_ftp(order_id)
             
             return True
         except Exception as e:
@@ -223,83 +325,95 @@ def update_order_status_shipped(client: BolAPIClient, order_id: str) -> bool:
         return False
 
 
-def fetch_callback_files_sftp() -> List[Dict[str, str]]:
+def iter_callback_files_sftp() -> Iterator[Dict[str, str]]:
     """
-    Fetch HTML status files from SFTP callback directory.
+    Yield HTML status files from the SFTP callback directory one at a time, so
+    only the file being processed is held in memory.
     
-    Returns:
-        List of dictionaries with 'filename' and 'content' keys
+    Yields:
+        Dictionaries with 'filename', 'content' and 'remote_path' keys
     """
-    files = []
-    transport = None
-    sftp = None
-    
     try:
-        # Create transport with timeout settings
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30  # Increase banner timeout
-        transport.auth_timeout = 30    # Increase auth timeout
-        
-        # Connect with credentials
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        
-        try:
-            # List files in callback directory
+        with _sftp_session() as sftp:
+            # List files in callback directory; listdir_attr returns the attributes
+            # from the same round trip as the names
             try:
-                file_list = sftp.listdir(SFTP_CALLBACK_DIR)
+                entries = sftp.listdir_attr(SFTP_CALLBACK_DIR)
             except FileNotFoundError:
                 logger.warning(f"Callback directory not found: {SFTP_CALLBACK_DIR}")
-                return files
-            
-            # Filter for HTML files
-            html_files = [f for f in file_list if f.lower().endswith('.html')]
+                return
             
-            logger.info(f"Found {len(html_files)} HTML files in callback directory")
+            # Filter for non-empty regular HTML files (an empty one is most likely
+            # still being uploaded and is picked up on a later run), oldest first
+            html_entries = [
+                e for e in entries
+                if e.filename.lower().endswith('.html')
+                and (e.st_mode is None or stat.S_ISREG(e.st_mode))
+                and e.st_size != 0
+            ]
+            html_entries.sort(key=lambda e: e.st_mtime or 0)
             
-            # Read each HTML file
-            for filename in html_files:
-                try:
-                    remote_path = f"{SFTP_CALLBACK_DIR}/{filename}"
-                    with sftp.open(remote_path, 'r') as f:
-                        content = f.read().decode('utf-8', errors='ignore')
-                        files.append({
-                            'filename': filename,
-                            'content': content,
-                            'remote_path': remote_path
-                        })
-                        logger.debug(f"Read file: {filename} ({len(content)} bytes)")
-                except Exception as e:
-                    logger.error(f"Error reading file {filename}: {e}")
+            logger.info(f"Found {len(html_entries)} HTML files in callback directory")
             
-        finally:
-            # Ensure connections are properly closed
-            if sftp:
-                try:
-                    sftp.close()
-                except:
-                    pass
-            if transport:
-                try:
-                    transport.close()
-                except:
-                    pass
+            # Read each HTML file. Up to CALLBACK_READ_AHEAD files are opened with
+            # prefetch() ahead of the one being yielded, so their read requests are
+            # in flight together on the one connection instead of one round trip
+            # after another.
+            opened = deque()
+            remaining = iter(html_entries)
+            try:
+                while True:
+                    while len(opened) < CALLBACK_READ_AHEAD:
+                        entry = next(remaining, None)
+                        if entry is None:
+                            break
+                        remote_path = f"{SFTP_CALLBACK_DIR}/{entry.filename}"
+                        f = None
+                        try:
+                            f = sftp.open(remote_path, 'r')
+                            f.prefetch(entry.st_size)
+                        except Exception as e:
+                            logger.error(f"Error reading file {entry.filename}: {e}")
+                            if f is not None:
+                                f.close()
+                            continue
+                        opened.append((entry.filename, remote_path, f))
+                    
+                    if not opened:
+                        break
+                    
+                    filename, remote_path, f = opened.popleft()
+                    try:
+                        with f:
+                            content = f.read().decode('utf-8', errors='ignore')
+                    except Exception as e:
+                        logger.error(f"Error reading file {filename}: {e}")
+                        continue
+                    logger.debug(f"Read file: {filename} ({len(content)} bytes)")
+                    yield {
+                        'filename': filename,
+                        'content': content,
+                        'remote_path': remote_path
+                    }
+            finally:
+                for _, _, f in opened:
+                    try:
+                        f.close()
+                    except Exception:
+                        pass
             
     except Exception as e:
         logger.error(f"Error connecting to SFTP for callbacks: {e}")
-        # Clean up on error
-        if sftp:
-            try:
-                sftp.close()
-            except:
-                pass
-        if transport:
-            try:
-                transport.close()
-            except:
-                pass
+
+
+def fetch_callback_files_sftp() -> List[Dict[str, str]]:
+    """
+    Fetch HTML status files from SFTP callback directory.
     
-    return files
+    Returns:
+        List of dictionaries with 'filename' and 'content' keys
+    """
+    return list(iter_callback_files_sftp())
 
 
 def process_callback_files() -> Dict[str, int]:
@@ -314,6 +428,12 @@ def process_callback_files() -> Dict[str, int]:
         - ignored: Number of files with "niet verzonden"
         - labels_deleted: Number of label PDFs deleted
     """
+    with _run_connection():
+        return _process_callback_files()
+
+
+def _process_callback_files() -> Dict[str, int]:
+    """Body of process_callback_files, run while one SFTP connection is shared"""
     stats = {
         'processed': 0,
         'updated': 0,
@@ -324,101 +444,116 @@ def process_callback_files() -> Dict[str, int]:
     
     logger.info("Starting callback file processing...")
     
-    # Fetch HTML files from SFTP
-    html_files = fetch_callback_files_sftp()
+    # Bol.com API client (shared between runs)
+    client = _get_api_client()
     
-    if not html_files:
-        logger.info("No callback files found")
-        return stats
+    # Process each file as it is read from SFTP instead of downloading them all first;
+    # "niet verzonden" files are archived together at the end
+    ignored_files = []
     
-    # Initialize Bol.com API client
-    client = BolAPIClient(BOL_CLIENT_ID, BOL_CLIENT_SECRET, test_mode=TEST_MODE)
-    
-    # Process each file
-    processed_files = []
-    
-    for file_info in html_files:
-        filename = file_info['filename']
-        content = file_info['content']
-        remote_path = file_info['remote_path']
-        
-        stats['processed'] += 1
-        
-        try:
-            # Parse HTML file
-            parsed = parse_html_status_file(content)
-            
-            if not parsed:
-                logger.warning(f"Could not parse file {filename}")
-                stats['errors'] += 1
-                continue
+    # Shipment updates are independent API round trips, so they run in a small
+    # pool while the remaining files are read; label deletes (SFTP) stay on this thread
+    pending = []
+    # Duplicate callbacks for one order (re-uploads) share a single update
+    updates_by_order = {}
+    with ThreadPoolExecutor(max_workers=SHIPMENT_UPDATE_WORKERS) as update_pool:
+        for file_info in iter_callback_files_sftp():
+            filename = file_info['filename']
+            content = file_info['content']
+            remote_path = file_info['remote_path']
             
-            order_id = parsed['order_id']
-            status = parsed['status']
+            stats['processed'] += 1
             
-            logger.info(f"File {filename}: Order {order_id}, Status: {status}")
-            
-            if status == 'niet verzonden':
-                logger.info(f"Ignoring order {order_id} (not shipped)")
-                stats['ignored'] += 1
-                processed_files.append(remote_path)
-                continue
-            
-            if status == 'verzonden':
-                # Update order status in Bol.com
-                success = update_order_status_shipped(client, order_id)
+            try:
+                # Parse HTML file; the status comes first because "niet verzonden"
+                # files are only archived and don't need the order ID patterns run
+                status = _find_status(content)
+                
+                if status == 'niet verzonden':
+                    logger.info(f"File {filename}: Status: {status}, ignoring (not shipped)")
+                    stats['ignored'] += 1
+                    ignored_files.append(remote_path)
+                    continue
+                
+                order_id = _find_order_id(content) if status else None
+                
+                if not (order_id and status):
+                    logger.warning(f"Could not parse file {filename}. Order ID: {order_id}, Status: {status}")
+                    stats['errors'] += 1
+                    continue
                 
-                if success:
-                    stats['updated'] += 1
-                    stats['labels_deleted'] += 1  # Label is deleted in update_order_status_shipped
-                    processed_files.append(remote_path)
-                    logger.info(f"✅ Successfully processed order {order_id} from {filename}")
+                logger.info(f"File {filename}: Order {order_id}, Status: {status}")
+                
+                if status == 'verzonden':
+                    # Update order status in Bol.com
+                    future = updates_by_order.get(order_id)
+                    if future is None:
+                        future = update_pool.submit(update_order_status_shipped, client, order_id,
+                                                    delete_label=False)
+                        updates_by_order[order_id] = future
+                    pending.append((future, filename, order_id, remote_path))
                 else:
+                    logger.warning(f"Unknown status '{status}' in file {filename}")
                     stats['errors'] += 1
-                    logger.error(f"❌ Failed to update order {order_id} from {filename}")
+                    
+            except Exception as e:
+                logger.error(f"Error processing file {filename}: {e}")
+                stats['errors'] += 1
+        
+        # Archive each updated file as soon as its update is done, so an interrupted
+        # run leaves as few already-shipped callbacks behind to be sent again
+        labels_deleted = set()
+        archive_dir_ready = False
+        for future, filename, order_id, remote_path in pending:
+            if future.result():
+                if order_id not in labels_deleted:
+                    delete_label_pdf_from_ftp(order_id)
+                    labels_deleted.add(order_id)
+                    stats['labels_deleted'] += 1
+                archive_processed_files([remote_path], create_dir=not archive_dir_ready)
+                archive_dir_ready = True
+                stats['updated'] += 1
+                logger.info(f"✅ Successfully processed order {order_id} from {filename}")
             else:
-                logger.warning(f"Unknown status '{status}' in file {filename}")
                 stats['errors'] += 1
-                
-        except Exception as e:
-            logger.error(f"Error processing file {filename}: {e}")
-            stats['errors'] += 1
+                logger.error(f"❌ Failed to update order {order_id} from {filename}")
+    
+    if not stats['processed']:
+        logger.info("No callback files found")
+        return stats
     
-    # Archive/delete processed files (optional - move to processed folder)
-    if processed_files:
-        archive_processed_files(processed_files)
+    # Archive/delete the ignored ("niet verzonden") files (move to processed folder)
+    if ignored_files:
+        archive_processed_files(ignored_files, create_dir=not archive_dir_ready)
     
     logger.info(f"Callback processing complete: {stats}")
     return stats
 
 
-def archive_processed_files(file_paths: List[str]) -> None:
+def archive_processed_files(file_paths: List[str], create_dir: bool = True) -> None:
     """
     Archive processed callback files (move to processed folder or delete).
     
     Args:
         file_paths: List of remote file paths to archive
+        create_dir: Create the processed folder first; callers archiving one file
+            at a time pass False once it has been created in the same run
     """
     try:
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30  # Increase banner timeout
-        transport.auth_timeout = 30    # Increase auth timeout
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        
-        try:
+        with _sftp_session() as sftp:
             # Create processed directory if it doesn't exist
             processed_dir = f"{SFTP_CALLBACK_DIR}/processed"
-            try:
-                sftp.mkdir(processed_dir)
-            except IOError:
-                pass  # Directory already exists
+            if create_dir:
+                try:
+                    sftp.mkdir(processed_dir)
+                except IOError:
+                    pass  # Directory already exists
             
-            # Move files to processed directory
+            # Move files to processed directory (one timestamp for the whole batch)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             for remote_path in file_paths:
                 try:
                     filename = os.path.basename(remote_path)
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     new_filename = f"{timestamp}_{filename}"
                     new_path = f"{processed_dir}/{new_filename}"
                     
@@ -432,10 +567,6 @@ def archive_processed_files(file_paths: List[str]) -> None:
                         logger.debug(f"Deleted {remote_path}")
                     except Exception as e2:
                         logger.error(f"Could not delete {remote_path}: {e2}")
-        
-        finally:
-            sftp.close()
-            transport.close()
             
     except Exception as e:
         logger.error(f"Error archiving processed files: {e}")
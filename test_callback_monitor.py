@@ -2,20 +2,17 @@
 Test script for the callback monitor functionality
 """
 
-import os
-import time
-import paramiko
+from sftp_pool import open_sftp
+import status_callback_handler
 from status_callback_handler import (
+    PersistentSFTP,
     parse_html_status_file,
     fetch_callback_files_sftp,
-    delete_label_pdf_from_ftp,
     process_callback_files
 )
 from config import (
     SFTP_HOST,
     SFTP_PORT,
-    SFTP_USERNAME,
-    SFTP_PASSWORD,
     SFTP_REMOTE_LABEL_DIR,
 )
 
@@ -29,11 +26,7 @@ def test_sftp_connection():
     print("="*80)
     
     try:
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30
-        transport.auth_timeout = 30
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
+        transport, sftp = open_sftp()
         
         print(f"✅ Connected to SFTP server: {SFTP_HOST}:{SFTP_PORT}")
         
@@ -165,31 +158,25 @@ def test_label_deletion_simulation():
     print("(No actual deletion is performed in test mode)")
     
     try:
-        # Try to connect and check label directory
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30
-        transport.auth_timeout = 30
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        
-        try:
-            files = sftp.listdir(SFTP_REMOTE_LABEL_DIR)
-            pdf_files = [f for f in files if f.lower().endswith('.pdf')]
+        # Check the label directory over the same connection the callback processor
+        # uses (the suite's shared connection when run from run_all_tests)
+        with status_callback_handler._sftp_session() as sftp:
+            try:
+                files = sftp.listdir(SFTP_REMOTE_LABEL_DIR)
+                pdf_files = [f for f in files if f.lower().endswith('.pdf')]
+                
+                print(f"✅ Label directory accessible")
+                print(f"✅ Found {len(pdf_files)} PDF label(s)")
+                
+                if pdf_files:
+                    print(f"\n   Example: To delete label for order 'TEST123':")
+                    print(f"   Would search for PDFs containing 'TEST123'")
+                    print(f"   Sample labels: {pdf_files[:3]}")
             
-            print(f"✅ Label directory accessible")
-            print(f"✅ Found {len(pdf_files)} PDF label(s)")
-            
-            if pdf_files:
-                print(f"\n   Example: To delete label for order 'TEST123':")
-                print(f"   Would search for PDFs containing 'TEST123'")
-                print(f"   Sample labels: {pdf_files[:3]}")
-        
-        except FileNotFoundError:
-            print(f"⚠️  Label directory not found: {SFTP_REMOTE_LABEL_DIR}")
-            return True  # Not a failure if directory doesn't exist yet
+            except FileNotFoundError:
+                print(f"⚠️  Label directory not found: {SFTP_REMOTE_LABEL_DIR}")
+                return True  # Not a failure if directory doesn't exist yet
         
-        sftp.close()
-        transport.close()
         return True
         
     except Exception as e:
@@ -248,20 +235,26 @@ def run_all_tests():
     
     results = {}
     
-    # Test 1: SFTP Connection
+    # Test 1: SFTP Connection (opens its own connection, so a cold connect is still tested)
     results['sftp_connection'] = test_sftp_connection()
     
     # Test 2: HTML Parsing
     results['html_parsing'] = test_html_parsing()
     
-    # Test 3: Fetch Callback Files
-    results['fetch_callbacks'] = test_fetch_callback_files()
-    
-    # Test 4: Label Deletion Simulation
-    results['label_deletion_sim'] = test_label_deletion_simulation()
-    
-    # Test 5: Full Processing (optional)
-    results['full_processing'] = test_full_callback_processing()
+    # Tests 3-5 share one SFTP connection instead of each doing its own handshake
+    status_callback_handler.SFTP_POOL = PersistentSFTP()
+    try:
+        # Test 3: Fetch Callback Files
+        results['fetch_callbacks'] = test_fetch_callback_files()
+        
+        # Test 4: Label Deletion Simulation
+        results['label_deletion_sim'] = test_label_deletion_simulation()
+        
+        # Test 5: Full Processing (optional)
+        results['full_processing'] = test_full_callback_processing()
+    finally:
+        status_callback_handler.SFTP_POOL.close()
+        status_callback_handler.SFTP_POOL = None
     
     # Summary
     print("\n" + "="*80)
@@ -8,12 +8,10 @@ from label_uploader import (
     upload_label_pdf_to_ftp,
     ensure_remote_label_directory
 )
-import paramiko
+from sftp_pool import open_sftp
 from config import (
     SFTP_HOST,
     SFTP_PORT,
-    SFTP_USERNAME,
-    SFTP_PASSWORD,
     SFTP_REMOTE_LABEL_DIR,
     LOCAL_LABEL_DIR
 )
@@ -25,11 +23,7 @@ def test_sftp_connection():
     print("="*80)
     
     try:
-        transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-        transport.banner_timeout = 30  # Increase banner timeout
-        transport.auth_timeout = 30    # Increase auth timeout
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
+        transport, sftp = open_sftp()
         
         print(f"✅ Connected to SFTP server: {SFTP_HOST}:{SFTP_PORT}")
         
@@ -0,0 +1,150 @@
+"""
+Test that the admin-config scheduler picks up config edits
+"""
+
+import json
+import os
+import tempfile
+import types
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import schedule
+
+import run_scheduler_with_admin_config as scheduler
+
+
+def _write_config(path, times):
+    """Write an admin config with the given processing times, every day enabled"""
+    config = {
+        'processing_times': times,
+        'weekly_schedule': {day: True for day in (
+            'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')},
+        'last_updated': None,
+    }
+    with open(path, 'w') as f:
+        json.dump(config, f)
+    # Make sure the mtime moves even on filesystems with coarse timestamps
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def _job_times():
+    """Scheduled job times as sorted HH:MM strings"""
+    return sorted(job.at_time.strftime('%H:%M') for job in schedule.get_jobs())
+
+
+@contextmanager
+def _temp_admin_config(times):
+    """Point the scheduler at a temporary admin config; order processing is a no-op"""
+    original_file = scheduler.ADMIN_CONFIG_FILE
+    original_process = scheduler.run_processing_once
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "admin_config.json")
+        _write_config(path, times)
+        scheduler.ADMIN_CONFIG_FILE = path
+        scheduler.run_processing_once = lambda: None
+        scheduler._config_cache.update(signature=None, reader=None)
+        schedule.clear()
+        try:
+            yield path
+        finally:
+            schedule.clear()
+            scheduler.ADMIN_CONFIG_FILE = original_file
+            scheduler.run_processing_once = original_process
+            scheduler._config_cache.update(signature=None, reader=None)
+
+
+def test_unchanged_config_keeps_jobs_and_reader():
+    """Without an edit, nothing is re-read or rebuilt"""
+    with _temp_admin_config(["08:30", "15:01"]):
+        scheduler.setup_scheduler()
+        jobs = schedule.get_jobs()
+        reader = scheduler.get_config()
+        
+        assert not scheduler.reload_scheduler_if_changed()
+        assert schedule.get_jobs() == jobs
+        assert scheduler.get_config() is reader
+
+
+def test_config_edit_rebuilds_jobs_after_job_runs():
+    """An edit is picked up even when a due job reads the new config first"""
+    with _temp_admin_config(["08:30"]) as path:
+        scheduler.setup_scheduler()
+        assert _job_times() == ["08:30"]
+        
+        # Admin edits the times
+        _write_config(path, ["09:45", "16:00"])
+        
+        # A pending job runs before the reload check and refreshes the reader cache
+        schedule.run_all()
+        assert scheduler._config_cache['signature'] == scheduler._config_signature()
+        
+        assert scheduler.reload_scheduler_if_changed()
+        assert _job_times() == ["09:45", "16:00"]
+        
+        # Nothing changed since the rebuild
+        assert not scheduler.reload_scheduler_if_changed()
+
+
+def _run_scheduler_iterations(on_first_sleep=None):
+    """
+    Run run_scheduler() for one loop iteration with a fake sleep.
+    
+    Returns:
+        The sleep durations requested; the second sleep stops the loop
+    """
+    slept = []
+    
+    def fake_sleep(seconds):
+        slept.append(seconds)
+        if len(slept) > 1:
+            raise KeyboardInterrupt
+        if on_first_sleep:
+            on_first_sleep()
+    
+    original_time = scheduler.time
+    scheduler.time = types.SimpleNamespace(sleep=fake_sleep)
+    try:
+        scheduler.run_scheduler()
+    finally:
+        scheduler.time = original_time
+    return slept
+
+
+def test_loop_sleeps_until_next_job():
+    """The loop sleeps until the next job, capped at MAX_IDLE_SECONDS"""
+    soon = (datetime.now() + timedelta(minutes=2)).strftime('%H:%M')
+    with _temp_admin_config([soon]):
+        slept = _run_scheduler_iterations()
+        assert 0 < slept[0] <= 120
+    
+    later = (datetime.now() - timedelta(minutes=1)).strftime('%H:%M')  # next run ~tomorrow
+    with _temp_admin_config([later]):
+        slept = _run_scheduler_iterations()
+        assert slept[0] == scheduler.MAX_IDLE_SECONDS
+
+
+def test_loop_rebuilds_jobs_after_config_edit():
+    """An edit made while the loop sleeps is applied on the next wake"""
+    with _temp_admin_config(["08:30"]) as path:
+        _run_scheduler_iterations(on_first_sleep=lambda: _write_config(path, ["10:15"]))
+        assert _job_times() == ["10:15"]
+
+
+if __name__ == "__main__":
+    print("="*80)
+    print("SCHEDULER CONFIG RELOAD TESTS")
+    print("="*80)
+    failed = 0
+    for test in (test_unchanged_config_keeps_jobs_and_reader,
+                 test_config_edit_rebuilds_jobs_after_job_runs,
+                 test_loop_sleeps_until_next_job,
+                 test_loop_rebuilds_jobs_after_config_edit):
+        try:
+            test()
+            print(f"✅ PASSED - {test.__name__}")
+        except AssertionError:
+            failed += 1
+            print(f"❌ FAILED - {test.__name__}")
+    raise SystemExit(1 if failed else 0)
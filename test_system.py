@@ -6,18 +6,20 @@ Tests: Tracking labels (Track & Trace codes), Shop column, duplicate prevention,
 import os
 import sys
 import logging
+import traceback
 from datetime import datetime
 import csv
+import io
+from functools import lru_cache
+from itertools import islice
 
-from bol_api_client import BolAPIClient
-from bol_dtos import Order
-from order_processing import run_processing_once
 from order_database import (
     init_database,
     get_processed_count,
     get_processed_orders_summary,
     is_order_processed,
 )
+from batch_files import find_csv_files
 from config import BOL_CLIENT_ID, BOL_CLIENT_SECRET, TEST_MODE, DEFAULT_SHOP_NAME
 
 # Setup logging
@@ -27,113 +29,135 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Expected CSV headers (per requirements - column G is "Batch Type", not "Category")
+EXPECTED_CSV_HEADERS = [
+    "Order ID",
+    "Shop",
+    "MP EAN",
+    "Quantity",
+    "Shipping Label",
+    "Order Time",
+    "Batch Type",  # Per requirements - must match file name
+    "Batch Number",
+    "Order Status",
+]
+_EXPECTED_HEADER_SET = frozenset(EXPECTED_CSV_HEADERS)
+_SHOP_COL_IDX = EXPECTED_CSV_HEADERS.index("Shop")
+_LABEL_COL_IDX = EXPECTED_CSV_HEADERS.index("Shipping Label")
+VALID_SHOPS = frozenset(["Jean", "Trivium"])
 
-def test_csv_structure(file_path: str) -> bool:
-    """Test CSV file structure and content"""
-    print("\n" + "="*80)
-    print("TESTING CSV FILE STRUCTURE")
-    print("="*80)
+
+@lru_cache(maxsize=1)
+def _get_client():
+    """One BolAPIClient shared by every processing run, so the access token is fetched once"""
+    from bol_api_client import BolAPIClient
+    return BolAPIClient(BOL_CLIENT_ID, BOL_CLIENT_SECRET, test_mode=TEST_MODE)
+
+
+def run_processing_once():
+    """Run the order pipeline, importing it (requests, paramiko, label generation) on first use"""
+    from order_processing import run_processing_once as _run_processing_once
+    return _run_processing_once(client=_get_client())
+
+
+def test_csv_structure(file_path: str, out=None) -> bool:
+    """Test CSV file structure and content (report is written to out in one go, default stdout)"""
+    buffer = io.StringIO()
+    try:
+        return _check_csv_structure(file_path, buffer)
+    finally:
+        (out or sys.stdout).write(buffer.getvalue())
+
+
+def _check_csv_structure(file_path: str, out) -> bool:
+    """Test CSV file structure and content, writing the report to out"""
+    print("\n" + "="*80, file=out)
+    print("TESTING CSV FILE STRUCTURE", file=out)
+    print("="*80, file=out)
     
     try:
+        # Only the header and the first 5 data rows are checked, so read just those
         with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
             reader = csv.reader(csvfile)
-            rows = list(reader)
+            headers = next(reader, None)
+            preview_rows = list(islice(reader, 5))
         
-        if not rows:
-            print("❌ CSV file is empty")
+        if headers is None:
+            print("❌ CSV file is empty", file=out)
             return False
         
-        # Expected headers (per requirements - column G is "Batch Type", not "Category")
-        expected_headers = [
-            "Order ID",
-            "Shop",
-            "MP EAN",
-            "Quantity",
-            "Shipping Label",
-            "Order Time",
-            "Batch Type",  # Per requirements - must match file name
-            "Batch Number",
-            "Order Status",
-        ]
-        
         # Check headers
-        headers = rows[0]
-        print(f"\nHeaders found: {headers}")
-        
-        if headers != expected_headers:
-            print(f"❌ Headers don't match!")
-            print(f"   Expected: {expected_headers}")
-            print(f"   Got:      {headers}")
-            return False
-        
-        print("✅ Headers are correct")
+        print(f"\nHeaders found: {headers}", file=out)
         
-        # Check for Customer Name (should NOT be present)
-        if "Customer Name" in headers:
-            print("❌ 'Customer Name' column still present (should be removed)")
+        if headers != EXPECTED_CSV_HEADERS:
+            # Only build the sets when something is wrong, to say what it is
+            headers_set = set(headers)
+            print(f"❌ Headers don't match!", file=out)
+            print(f"   Expected: {EXPECTED_CSV_HEADERS}", file=out)
+            print(f"   Got:      {headers}", file=out)
+            missing = [h for h in EXPECTED_CSV_HEADERS if h not in headers_set]
+            extra = [h for h in headers if h not in _EXPECTED_HEADER_SET]
+            if missing:
+                print(f"   Missing:  {missing}", file=out)
+            if extra:
+                print(f"   Extra:    {extra}", file=out)
+            if "Customer Name" in headers_set:
+                print("❌ 'Customer Name' column still present (should be removed)", file=out)
             return False
-        print("✅ 'Customer Name' column removed")
         
-        # Check for Shop column
-        if "Shop" not in headers:
-            print("❌ 'Shop' column missing")
-            return False
-        print("✅ 'Shop' column present")
+        # Exact match implies Shop is present and Customer Name is not
+        print("✅ Headers are correct", file=out)
+        print("✅ 'Customer Name' column removed", file=out)
+        print("✅ 'Shop' column present", file=out)
         
-        # Check data rows
-        shop_col_idx = headers.index("Shop")
-        zpl_col_idx = headers.index("Shipping Label")
+        # Check data rows (headers match exactly, so the column positions are fixed)
+        shop_col_idx = _SHOP_COL_IDX
+        zpl_col_idx = _LABEL_COL_IDX
         
-        print(f"\nChecking data rows (first 5 rows):")
+        print(f"\nChecking data rows (first 5 rows):", file=out)
         has_zpl = False
         has_shop = False
         
-        for row_idx, row in enumerate(rows[1:], start=2):
-            if row_idx > 6:  # Check first 5 data rows
-                break
-            
-            if not any(cell for cell in row):
+        for row_idx, row in enumerate(preview_rows, start=2):
+            if not any(row):
                 continue
             
             # Check Shop column
             shop_value = row[shop_col_idx] if shop_col_idx < len(row) else None
             if shop_value:
                 has_shop = True
-                if shop_value not in ["Jean", "Trivium"]:
-                    print(f"❌ Row {row_idx}: Invalid shop value: {shop_value}")
+                if shop_value not in VALID_SHOPS:
+                    print(f"❌ Row {row_idx}: Invalid shop value: {shop_value}", file=out)
                     return False
-                print(f"   Row {row_idx}: Shop = {shop_value}")
+                print(f"   Row {row_idx}: Shop = {shop_value}", file=out)
             
             # Check Shipping Label column (now contains Track & Trace info)
             tracking_value = row[zpl_col_idx] if zpl_col_idx < len(row) else None
             if tracking_value:
                 has_zpl = True  # Keep variable name for compatibility
-                tracking_str = str(tracking_value)
-                tracking_len = len(tracking_str)
-                if tracking_len > 0:
-                    print(f"   Row {row_idx}: Tracking info present: {tracking_str}")
-                    # Check if it looks like tracking info (contains alphanumeric code)
-                    if tracking_len > 5:  # Reasonable minimum length for tracking code
-                        print(f"      ✅ Tracking format valid")
-                    else:
-                        print(f"      ⚠️  Tracking format looks incomplete (but data present)")
+                # csv.reader already yields non-empty str here, no str()/len() > 0 needed
+                print(f"   Row {row_idx}: Tracking info present: {tracking_value}", file=out)
+                # Check if it looks like tracking info (contains alphanumeric code)
+                if len(tracking_value) > 5:  # Reasonable minimum length for tracking code
+                    print(f"      ✅ Tracking format valid", file=out)
+                else:
+                    print(f"      ⚠️  Tracking format looks incomplete (but data present)", file=out)
         
         if not has_shop:
-            print("❌ No shop values found in data rows")
+            print("❌ No shop values found in data rows", file=out)
             return False
         
         if not has_zpl:
-            print("⚠️  No tracking info found in data rows (may be empty if items are not FBR or API failed)")
+            print("⚠️  No tracking info found in data rows (may be empty if items are not FBR or API failed)", file=out)
         else:
-            print("✅ Tracking information found in Shipping Label column")
+            print("✅ Tracking information found in Shipping Label column", file=out)
         
-        print(f"\n✅ CSV structure test PASSED")
+        print(f"\n✅ CSV structure test PASSED", file=out)
         return True
         
     except Exception as e:
-        print(f"❌ Error testing CSV file: {e}")
-        import traceback
-        traceback.print_exc()
+        print(f"❌ Error testing CSV file: {e}", file=out)
+        traceback.print_exc(file=out)
         return False
 
 
@@ -161,7 +185,6 @@ def test_database() -> bool:
         
     except Exception as e:
         print(f"❌ Database test failed: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -207,49 +230,13 @@ def test_duplicate_prevention() -> bool:
         
     except Exception as e:
         print(f"❌ Duplicate prevention test failed: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
 
-def find_latest_csv_file() -> str:
-    """Find the most recently created CSV file"""
-    batch_dir = "batches"
-    if not os.path.exists(batch_dir):
-        return None
-    
-    latest_file = None
-    latest_time = 0
-    
-    for root, dirs, files in os.walk(batch_dir):
-        for file in files:
-            if file.endswith('.csv'):
-                file_path = os.path.join(root, file)
-                try:
-                    mtime = os.path.getmtime(file_path)
-                    if mtime > latest_time:
-                        latest_time = mtime
-                        latest_file = file_path
-                except Exception:
-                    continue
-    
-    return latest_file
-
-
 def find_all_csv_files() -> list:
-    """Find all CSV files in batches directory"""
-    batch_dir = "batches"
-    if not os.path.exists(batch_dir):
-        return []
-    
-    csv_files = []
-    for root, dirs, files in os.walk(batch_dir):
-        for file in files:
-            if file.endswith('.csv'):
-                file_path = os.path.join(root, file)
-                csv_files.append(file_path)
-    
-    return sorted(csv_files, key=os.path.getmtime, reverse=True)
+    """Find all CSV files in batches directory, newest first"""
+    return [path for path, _, _ in find_csv_files()]
 
 
 def main():
@@ -276,7 +263,6 @@ def main():
         results['processing'] = True
     except Exception as e:
         print(f"❌ Order processing failed: {e}")
-        import traceback
         traceback.print_exc()
         results['processing'] = False
     
@@ -1,8 +1,56 @@
 """Verify that Batch Number column matches filename"""
 
 import csv
-import glob
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_files import find_csv_files
+
+def _verify_one(file_path):
+    """
+    Check a single file's Batch Number column against its filename.
+    
+    Returns:
+        (filename, ok, message) - ok is False only for a real mismatch/error
+    """
+    # Extract batch number from filename (full filename without extension)
+    filename = os.path.basename(file_path)
+    try:
+        # Format: S-001.csv, SL-001.csv, M-001.csv
+        # Expected batch number should be full filename without extension: "S-001", "SL-001", "M-001"
+        expected_batch = os.path.splitext(filename)[0]  # e.g., "S-001", "SL-001", "M-001"
+        
+        # Only the header and first data row are needed, so stop reading there
+        # instead of loading the whole batch file
+        with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
+            reader = csv.reader(csvfile)
+            headers = next(reader, None)
+            first_row = next(reader, None)
+        
+        if headers is None:
+            return filename, False, f"❌ {filename}: File is empty"
+        
+        # Get headers
+        try:
+            batch_col_idx = headers.index("Batch Number")
+        except ValueError:
+            return filename, False, f"❌ {filename}: 'Batch Number' column not found"
+        
+        # Check first data row
+        if first_row is None:
+            return filename, True, f"⚠️  {filename}: No data rows"
+        
+        # Get batch number from first data row
+        actual_batch = first_row[batch_col_idx] if batch_col_idx < len(first_row) else ""
+        actual_batch_str = str(actual_batch) if actual_batch else ""
+        
+        # Compare
+        if actual_batch_str == expected_batch:
+            return filename, True, f"✅ {filename}: Batch Number column = '{actual_batch_str}' (matches filename)"
+        return filename, False, f"❌ {filename}: Batch Number column = '{actual_batch_str}' (expected '{expected_batch}')"
+        
+    except Exception as e:
+        return filename, False, f"❌ {filename}: Error - {e}"
 
 def verify_batch_numbers():
     """Check if Batch Number column matches filename"""
@@ -10,9 +58,8 @@ def verify_batch_numbers():
     print("VERIFYING BATCH NUMBER MATCHES FILENAME")
     print("="*80)
     
-    # Find all CSV files
-    pattern = "batches/**/*.csv"
-    files = glob.glob(pattern, recursive=True)
+    # Find all CSV files (one scandir walk via batch_files)
+    files = [path for path, _, _ in find_csv_files()]
     
     if not files:
         print("No CSV files found")
@@ -20,58 +67,15 @@ def verify_batch_numbers():
     
     print(f"\nFound {len(files)} CSV file(s)\n")
     
-    all_correct = True
+    # Each file is an independent read, so check them concurrently;
+    # map() keeps the results in filename order for the report
+    with ThreadPoolExecutor(max_workers=min(32, len(files))) as executor:
+        results = list(executor.map(_verify_one, sorted(files)))
     
-    for file_path in sorted(files):
-        try:
-            # Extract batch number from filename (full filename without extension)
-            filename = os.path.basename(file_path)
-            # Format: S-001.csv, SL-001.csv, M-001.csv
-            # Expected batch number should be full filename without extension: "S-001", "SL-001", "M-001"
-            expected_batch = filename.replace(".csv", "")  # e.g., "S-001", "SL-001", "M-001"
-            
-            # Open CSV file
-            with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                rows = list(reader)
-            
-            if not rows:
-                print(f"❌ {filename}: File is empty")
-                all_correct = False
-                continue
-            
-            # Get headers
-            headers = rows[0]
-            batch_col_idx = None
-            for idx, header in enumerate(headers):
-                if header == "Batch Number":
-                    batch_col_idx = idx
-                    break
-            
-            if batch_col_idx is None:
-                print(f"❌ {filename}: 'Batch Number' column not found")
-                all_correct = False
-                continue
-            
-            # Check first data row
-            if len(rows) < 2:
-                print(f"⚠️  {filename}: No data rows")
-                continue
-            
-            # Get batch number from first data row
-            actual_batch = rows[1][batch_col_idx] if batch_col_idx < len(rows[1]) else ""
-            actual_batch_str = str(actual_batch) if actual_batch else ""
-            
-            # Compare
-            if actual_batch_str == expected_batch:
-                print(f"✅ {filename}: Batch Number column = '{actual_batch_str}' (matches filename)")
-            else:
-                print(f"❌ {filename}: Batch Number column = '{actual_batch_str}' (expected '{expected_batch}')")
-                all_correct = False
-            
-        except Exception as e:
-            print(f"❌ {filename}: Error - {e}")
-            all_correct = False
+    # One write for the whole report instead of a print per file
+    print("\n".join(message for _, _, message in results))
+    
+    all_correct = all(ok for _, ok, _ in results)
     
     print("\n" + "="*80)
     if all_correct:
@@ -82,4 +86,3 @@ def verify_batch_numbers():
 
 if __name__ == "__main__":
     verify_batch_numbers()
-
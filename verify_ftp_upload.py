@@ -2,34 +2,57 @@
 Verify that Excel files are actually uploaded to the SFTP server
 """
 
-import paramiko
-import os
+from sftp_pool import open_sftp
 import sys
+import traceback
+from operator import attrgetter
 from config import (
     SFTP_HOST,
     SFTP_PORT,
     SFTP_USERNAME,
-    SFTP_PASSWORD,
     SFTP_REMOTE_BATCH_DIR,
 )
 
-def verify_ftp_files():
-    """Connect to SFTP and list files in the remote directory"""
-    print("="*80)
-    print("SFTP Upload Verification")
-    print("="*80)
-    print(f"\nConnecting to: {SFTP_HOST}:{SFTP_PORT}")
-    print(f"Username: {SFTP_USERNAME}")
-    print(f"Remote directory: {SFTP_REMOTE_BATCH_DIR}\n")
+# Separator lines for the report, built once
+SEP = "=" * 80
+RULE = "-" * 80
+
+# Batch file extensions, checked in one endswith() call
+_CSV_SUFFIXES = ('.csv', '.CSV')
+
+def _human(n: int) -> str:
+    """File size with a B/KB/MB/GB unit, using integer division"""
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n} {unit}"
+        n //= 1024
+    return f"{n} GB"
+
+def verify_ftp_files(sftp=None):
+    """
+    Connect to SFTP and list files in the remote directory
     
-    transport = paramiko.Transport((SFTP_HOST, SFTP_PORT))
-    transport.banner_timeout = 30  # Increase banner timeout
-    transport.auth_timeout = 30    # Increase auth timeout
+    Args:
+        sftp: Optional open paramiko.SFTPClient to reuse (e.g. from SFTPPool.acquire()
+            or PersistentSFTP.get()), so repeated checks skip the SSH handshake; it is
+            left open. Without one, a connection is opened for this call and closed.
+    
+    Returns:
+        True if the batch directory was listed and contains CSV files
+    """
+    print(f"{SEP}\nSFTP Upload Verification\n{SEP}\n"
+          f"\nConnecting to: {SFTP_HOST}:{SFTP_PORT}\n"
+          f"Username: {SFTP_USERNAME}\n"
+          f"Remote directory: {SFTP_REMOTE_BATCH_DIR}\n")
+    
+    transport = None
+    found = False
     try:
-        transport.connect(username=SFTP_USERNAME, password=SFTP_PASSWORD)
-        sftp = paramiko.SFTPClient.from_transport(transport)
-        
-        print("✅ Successfully connected to SFTP server\n")
+        if sftp is None:
+            transport, sftp = open_sftp()
+            print("✅ Successfully connected to SFTP server\n")
+        else:
+            print("✅ Using existing SFTP connection\n")
         
         # Try to change to remote directory
         try:
@@ -42,58 +65,62 @@ def verify_ftp_files():
             try:
                 current_dir = sftp.getcwd()
                 print(f"Current directory: {current_dir}")
-                files = sftp.listdir(current_dir)
+                files = [attr.filename for attr in sftp.listdir_iter(current_dir)]
                 print(f"Files in current directory: {files[:10]}...")  # Show first 10
             except Exception as e2:
                 print(f"Error listing directory: {e2}")
-            finally:
-                transport.close()
-                return
+            # The outer finally closes our transport (if any) and prints the banner
+            return False
         
         # List all files in the remote directory
         try:
-            files = sftp.listdir(SFTP_REMOTE_BATCH_DIR)
-            csv_files = [f for f in files if f.endswith('.csv')]
+            # listdir_iter pipelines the READDIR requests and returns the sizes with the
+            # listing (no stat() round-trip per file); one pass keeps only what is shown
+            total_count = 0
+            csv_entries = []
+            other_files = []
+            for entry in sftp.listdir_iter(SFTP_REMOTE_BATCH_DIR):
+                total_count += 1
+                if entry.filename.endswith(_CSV_SUFFIXES):
+                    csv_entries.append(entry)
+                elif len(other_files) < 20:
+                    other_files.append(entry.filename)
             
-            print(f"📁 Total files in directory: {len(files)}")
-            print(f"📊 CSV files found: {len(csv_files)}\n")
+            print(f"📁 Total files in directory: {total_count}")
+            print(f"📊 CSV files found: {len(csv_entries)}\n")
             
-            if csv_files:
-                print("✅ Excel files found on SFTP server:")
-                print("-" * 80)
-                for i, filename in enumerate(sorted(xlsx_files), 1):
-                    try:
-                        # Get file stats
-                        file_path = f"{SFTP_REMOTE_BATCH_DIR}/{filename}"
-                        file_stat = sftp.stat(file_path)
-                        size_kb = file_stat.st_size / 1024
-                        print(f"{i:3d}. {filename:30s} ({size_kb:.2f} KB)")
-                    except Exception as e:
-                        print(f"{i:3d}. {filename:30s} (Error getting stats: {e})")
-                print("-" * 80)
+            if csv_entries:
+                found = True
+                print("✅ CSV files found on SFTP server:")
+                print(RULE)
+                csv_entries.sort(key=attrgetter('filename'))
+                # One write for the whole table instead of a print per file
+                print("\n".join(
+                    f"{i:3d}. {entry.filename:30s} ({_human(entry.st_size or 0)})"
+                    for i, entry in enumerate(csv_entries, 1)
+                ))
+                print(RULE)
             else:
                 print("❌ No CSV files found in the remote directory")
                 print("\nAvailable files:")
-                for f in files[:20]:  # Show first 20 files
+                for f in other_files:  # Show first 20 files
                     print(f"  - {f}")
-                if len(files) > 20:
-                    print(f"  ... and {len(files) - 20} more files")
+                if total_count > 20:
+                    print(f"  ... and {total_count - 20} more files")
             
         except Exception as e:
             print(f"❌ Error listing files: {e}")
-            import traceback
             traceback.print_exc()
         
     except Exception as e:
         print(f"❌ Connection failed: {e}")
-        import traceback
         traceback.print_exc()
     finally:
-        transport.close()
-        print("\n" + "="*80)
-        print("Verification complete")
-        print("="*80)
+        if transport:
+            transport.close()
+        print(f"\n{SEP}\nVerification complete\n{SEP}")
+    return found
 
 if __name__ == "__main__":
-    verify_ftp_files()
+    sys.exit(0 if verify_ftp_files() else 1)
 